@@ -0,0 +1,155 @@
+"""
+Vectorized batch solver for large numbers of puzzles at once.
+
+N puzzles are held as an (N, 81) uint8 array of numbers (0 for empty)
+and an (N, 81) uint16 array of candidate masks, using the same bit
+layout as classes2 (bit n - 1 set if n is a candidate). Peer
+elimination, naked singles and hidden singles are applied to every
+puzzle at the same time with NumPy array operations, and only the
+puzzles that are still unsolved afterwards are handed one by one to a
+backtracking engine of the solver module.
+
+Requires numpy.
+"""
+import numpy as np
+
+import classes2 as classes
+import solver
+
+ALL_CANDIDATES = classes.ALL_CANDIDATES
+# (81, 20) peer indexes and (27, 9) square indexes of every set
+PEERS = np.array(classes.PEERS, dtype=np.intp)
+UNITS = np.array(classes.UNIT_CELLS, dtype=np.intp)
+# mask bit of each number, popcount and lowest candidate of each mask
+NUMBER_BITS = np.array(classes.NUMBER_BITS, dtype=np.uint16)
+POPCOUNT = np.array(classes.POPCOUNT, dtype=np.uint8)
+LOWEST_BIT = np.array(classes.LOWEST_BIT, dtype=np.int8)
+# shifts that split a mask into its 9 candidate bits along a new last axis
+SHIFTS = np.arange(9, dtype=np.uint16)
+
+# puzzles propagated together, which bounds the size of the temporary arrays
+CHUNK_SIZE = 4096
+
+
+def to_array(puzzles):
+    """returns an (N, 81) uint8 array from a list of 9x9 lists (Grid.copy_grid()
+        format) or anything numpy can reshape to (N, 81)"""
+    return np.array(puzzles, dtype=np.uint8).reshape(-1, 81)
+
+
+def to_grids(digits):
+    """returns the rows of an (N, 81) array as a list of 9x9 lists"""
+    return [row.reshape(9, 9).tolist() for row in digits]
+
+
+class BatchSolver:
+    """Solves an (N, 81) array of puzzles.
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    digits          (N, 81) uint8   numbers of every puzzle, filled in
+                                    as the puzzles are solved
+
+    masks           (N, 81) uint16  candidate masks after propagate()
+
+    valid           (N,) bool       False once a puzzle is found to have
+                                    no solution
+
+    searched        int             puzzles that needed backtracking
+
+    engine is the solver engine used for the puzzles propagation leaves
+    unsolved. "dlx" is the default as it is the quickest on what is left
+    after the singles are gone.
+    """
+    def __init__(self, puzzles, engine="dlx", chunk_size=CHUNK_SIZE):
+        self.digits = to_array(puzzles)
+        self.masks = np.zeros(self.digits.shape, dtype=np.uint16)
+        self.valid = np.ones(len(self.digits), dtype=bool)
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.searched = 0
+
+    def propagate(self):
+        """Applies peer elimination, naked singles and hidden singles to every
+            puzzle until none of them changes any more"""
+        for start in range(0, len(self.digits), self.chunk_size):
+            stop = start + self.chunk_size
+            self.valid[start:stop] = propagate(self.digits[start:stop], self.masks[start:stop])
+
+    @property
+    def solved(self):
+        """(N,) bool, True for the puzzles with every square filled in"""
+        return self.valid & (self.digits != 0).all(axis=1)
+
+    def solve(self):
+        """Propagates every puzzle, then searches the ones that are still not
+            solved. Returns the (N,) bool array of solved puzzles"""
+        self.propagate()
+
+        for i in np.flatnonzero(self.valid & ~self.solved):
+            self.searched += 1
+            solution = solver.solve(self.digits[i].reshape(9, 9).tolist(), engine=self.engine).solution
+
+            if solution is None:
+                self.valid[i] = False
+            else:
+                self.digits[i] = np.array(solution, dtype=np.uint8).reshape(81)
+
+        return self.solved
+
+
+def propagate(digits, masks):
+    """Propagates the (N, 81) digits array in place, leaving the candidates of
+        every puzzle in masks. Returns the (N,) bool array of puzzles that were
+        not found to be contradictory"""
+    valid = np.ones(len(digits), dtype=bool)
+    active = np.arange(len(digits))
+
+    while active.size:
+        numbers = digits[active]
+        bits = NUMBER_BITS[numbers]
+
+        # candidates: every number not placed in one of the 20 peers
+        peer_bits = np.bitwise_or.reduce(bits[:, PEERS], axis=2)
+        empty = numbers == 0
+        candidates = np.where(empty, ALL_CANDIDATES & ~peer_bits, 0).astype(np.uint16)
+        masks[active] = candidates
+
+        # per set and number: how many squares can take it, and whether it is placed
+        unit_bits = (candidates[:, UNITS, None] >> SHIFTS) & 1
+        positions = unit_bits.sum(axis=2)
+        used = np.bitwise_or.reduce(bits[:, UNITS], axis=2)
+        placed = (used[:, :, None] >> SHIFTS) & 1
+
+        # a number placed twice in a set, an empty square without candidates,
+        # or a number missing from a set that no square of the set can take
+        bad = ((bits & peer_bits) != 0).any(axis=1) | \
+            (empty & (candidates == 0)).any(axis=1) | \
+            ((positions == 0) & (placed == 0)).any(axis=(1, 2))
+
+        # naked singles
+        new = np.where(empty & (POPCOUNT[candidates] == 1), LOWEST_BIT[candidates] + 1, 0)
+
+        # hidden singles: the only square of a set that can take a number
+        puzzle, unit, number = np.nonzero((positions == 1) & (placed == 0))
+        square = UNITS[unit, unit_bits[puzzle, unit, :, number].argmax(axis=1)]
+        new[puzzle, square] = number + 1
+
+        new[bad] = 0
+        progress = (new != 0).any(axis=1)
+        digits[active] = np.where(new != 0, new, numbers)
+
+        valid[active[bad]] = False
+        active = active[progress & ~bad]
+
+    return valid
+
+
+def solve_batch(puzzles, engine="dlx"):
+    """Solves a list of puzzles in the Grid.copy_grid() format and returns a
+        list with the 9x9 solution of each, or None if it has no solution"""
+    batch_solver = BatchSolver(puzzles, engine)
+    solved = batch_solver.solve()
+    return [grid if ok else None for grid, ok in zip(to_grids(batch_solver.digits), solved)]
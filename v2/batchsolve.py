@@ -0,0 +1,205 @@
+"""
+Solves a file of puzzles across several processes.
+
+    python -m batchsolve puzzles.txt [-o solutions.txt] [-j WORKERS]
+                         [--engine ENGINE] [--timeout SECONDS]
+                         [--start START] [--stop STOP]
+
+puzzles.txt can be a text file in any format read.InputReader accepts or
+a binary corpus file (see corpus.py) ending in .sdc, and --start and
+--stop pick a range of its puzzles, so a corpus can be split between
+several runs.
+
+The puzzles are read into one shared memory buffer of 81 bytes per
+puzzle, and the workers write their answers into a second shared buffer
+of RECORD_SIZE bytes per puzzle, so no Grid or list is ever pickled
+between processes: a task is just a (start, stop) range of puzzles.
+Ranges are handed out in chunks sized from the measured cost per puzzle,
+and the solutions are written out in input order as soon as every puzzle
+before them is done. The throughput is reported on stderr at the end.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from itertools import islice
+from time import perf_counter
+
+import read
+import solver
+
+# every answer is 81 numbers followed by one status byte
+RECORD_SIZE = 82
+PENDING, SOLVED, UNSOLVABLE, TIMEOUT = range(4)
+STATUSES = {solver.SOLVED: SOLVED, solver.UNSOLVABLE: UNSOLVABLE, solver.TIMEOUT: TIMEOUT}
+
+# files read with corpus.Corpus instead of read.InputReader
+CORPUS_SUFFIX = ".sdc"
+
+# how long a single task should take, and how many tasks each worker may
+# have queued, when sizing chunks
+TARGET_TASK_SECONDS = 0.25
+TASKS_PER_WORKER = 2
+
+# shared memory blocks attached by each worker process
+_puzzles = None
+_answers = None
+
+
+def read_puzzles(path, start=0, stop=None):
+    """returns puzzles start to stop - 1 of a text or corpus file as one bytes
+        object of 81 numbers per puzzle"""
+    if path.endswith(CORPUS_SUFFIX):
+        import corpus
+        with corpus.Corpus(path) as puzzles:
+            return puzzles[start:stop].tobytes()
+
+    data = bytearray()
+    for record in islice(read.InputReader().from_file(path, flat=True), start, stop):
+        data += record
+    return bytes(data)
+
+
+def _attach(puzzles_name, answers_name):
+    """worker initializer, attaches the shared puzzle and answer buffers"""
+    global _puzzles, _answers
+    _puzzles = shared_memory.SharedMemory(name=puzzles_name)
+    _answers = shared_memory.SharedMemory(name=answers_name)
+
+
+def _solve_range(start, stop, engine, timeout):
+    """solves puzzles start to stop - 1 of the shared buffer, returns
+        (start, stop, seconds taken)"""
+    began = perf_counter()
+    puzzles = _puzzles.buf
+    answers = _answers.buf
+
+    if engine == "batch":
+        import numpy as np
+        import batch
+        numbers = np.frombuffer(puzzles, dtype=np.uint8, count=81 * (stop - start), offset=81 * start)
+        batch_solver = batch.BatchSolver(numbers.reshape(-1, 81))
+        solved = batch_solver.solve()
+
+        for i in range(start, stop):
+            record = RECORD_SIZE * i
+            answers[record:record + 81] = batch_solver.digits[i - start].tobytes()
+            answers[record + 81] = SOLVED if solved[i - start] else UNSOLVABLE
+
+        return start, stop, perf_counter() - began
+
+    for i in range(start, stop):
+        numbers = puzzles[81 * i:81 * i + 81]
+        puzzle = [list(numbers[9 * row:9 * row + 9]) for row in range(9)]
+        result = solver.solve(puzzle, engine=engine, timeout=timeout)
+
+        record = RECORD_SIZE * i
+        if result.solution is not None:
+            answers[record:record + 81] = bytes(number for row in result.solution for number in row)
+        answers[record + 81] = STATUSES[result.status]
+
+    return start, stop, perf_counter() - began
+
+
+def solve_file(path, output=None, workers=None, engine="dlx", timeout=None, start=0, stop=None):
+    """Solves every puzzle of path and writes one line per puzzle to output
+        (a file name or file object, stdout if None): the 81 numbers of the
+        solution, or an empty line if there is none. Returns the number of
+        puzzles with each status, and the puzzles solved per second. start and
+        stop pick a range of the puzzles of path. The batch engine has no
+        timeout, so it raises ValueError if one is given"""
+    if engine == "batch" and timeout is not None:
+        raise ValueError("the batch engine does not support a timeout")
+    data = read_puzzles(path, start, stop)
+    total = len(data) // 81
+    workers = workers or os.cpu_count() or 1
+    counts = {SOLVED: 0, UNSOLVABLE: 0, TIMEOUT: 0}
+    began = perf_counter()
+
+    if total == 0:
+        return counts, 0.0
+
+    writer = read.OutputWriter(output or sys.stdout)
+    puzzles = shared_memory.SharedMemory(create=True, size=len(data))
+    answers = shared_memory.SharedMemory(create=True, size=RECORD_SIZE * total)
+
+    try:
+        puzzles.buf[:len(data)] = data
+        answers.buf[:RECORD_SIZE * total] = bytes(RECORD_SIZE * total)
+
+        with ProcessPoolExecutor(workers, initializer=_attach,
+                                 initargs=(puzzles.name, answers.name)) as executor:
+            next_puzzle = 0         # first puzzle not handed out yet
+            written = 0             # first puzzle not written out yet
+            done = bytearray(total)
+            # seconds per puzzle measured so far, None before the first task
+            cost = None
+            running = set()
+
+            while written < total:
+                # keep every worker busy with chunks that take about TARGET_TASK_SECONDS,
+                # but small enough that the last chunks are shared between the workers
+                while next_puzzle < total and len(running) < workers * TASKS_PER_WORKER:
+                    remaining = total - next_puzzle
+                    size = 1 if cost is None else int(TARGET_TASK_SECONDS / max(cost, 1e-9))
+                    size = max(1, min(size, remaining // (workers * TASKS_PER_WORKER) or 1))
+                    running.add(executor.submit(_solve_range, next_puzzle, next_puzzle + size,
+                                                engine, timeout))
+                    next_puzzle += size
+
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    start, stop, seconds = future.result()
+                    done[start:stop] = b"\x01" * (stop - start)
+                    task_cost = seconds / (stop - start)
+                    cost = task_cost if cost is None else 0.7 * cost + 0.3 * task_cost
+
+                # write out every answer that has no unfinished puzzle before it
+                while written < total and done[written]:
+                    record = RECORD_SIZE * written
+                    status = answers.buf[record + 81]
+                    counts[status] += 1
+                    writer.write(bytes(answers.buf[record:record + 81]) if status == SOLVED else None)
+                    written += 1
+    finally:
+        try:
+            writer.close()
+        finally:
+            for block in (puzzles, answers):
+                try:
+                    block.close()
+                finally:
+                    block.unlink()
+
+    return counts, total / (perf_counter() - began)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m batchsolve",
+                                     description="Solve a file of puzzles across several processes.")
+    parser.add_argument("path", help="file of puzzles (81 character lines, 9 line grids, SDK, CSV "
+                                     "or a .sdc corpus)")
+    parser.add_argument("-o", "--output", help="file for the solutions (stdout if not given)")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes (default: every core)")
+    # every worker already has a core, so the parallel engine would only add processes
+    parser.add_argument("--engine", default="dlx",
+                        choices=tuple(engine for engine in solver.ENGINES if engine != "parallel") + ("batch",),
+                        help="solving engine, batch needs numpy (default: dlx)")
+    parser.add_argument("--timeout", type=float, help="seconds allowed per puzzle")
+    parser.add_argument("--start", type=int, default=0, help="first puzzle to solve (default: 0)")
+    parser.add_argument("--stop", type=int, help="puzzle to stop before (default: the end of the file)")
+    args = parser.parse_args(args)
+    if args.engine == "batch" and args.timeout is not None:
+        parser.error("--timeout can not be used with --engine batch")
+
+    counts, rate = solve_file(args.path, args.output, args.workers, args.engine, args.timeout,
+                              args.start, args.stop)
+
+    print("{0} solved, {1} unsolvable, {2} timed out, {3:.1f} puzzles/sec".format(
+        counts[SOLVED], counts[UNSOLVABLE], counts[TIMEOUT], rate), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
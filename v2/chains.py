@@ -0,0 +1,303 @@
+"""
+Chain techniques, for the grids that subsets and fish can not solve.
+
+Every candidate (a square and a number it can still hold) is linked to
+others:
+
+    strong      one of the two is true: the two candidates of a square with
+                two candidates, or the two squares of a set where a number
+                can still go
+    weak        at most one of the two is true: two candidates of a square,
+                or the same number in two squares sharing a set
+
+A LinkGraph holds the strong links of one state of a grid and looks up
+weak links as they are needed, remembering them. Chains builds the graph
+once for each state it is used on and runs these over it:
+
+    simple_coloring     colours the squares joined by the strong links of a
+                        number with two alternating colours, one of which
+                        is true
+    xy_chains           chains of squares with two candidates, each sharing
+                        a set and a number with the next, where one end or
+                        the other holds the number they start and end on
+    forcing_chains      assumes each side of a strong link in turn and
+                        follows the singles for up to depth rounds; what
+                        every side that does not fail agrees on is true
+                        (a side that fails is false, which covers nishio)
+
+Each returns the number of candidates removed, like the techniques of
+classes2.Grid, and stops after the first chain that removes any. Grids
+use DEFAULT_CHAINS through Grid.simple_coloring(), Grid.xy_chains() and
+Grid.forcing_chains().
+"""
+from time import perf_counter
+
+from classes2 import LOWEST_BIT, MASK_INDEXES, NUMBER_BITS, PEERS, POPCOUNT, UNIT_CELLS
+
+# squares with two candidates a chain may go through in xy_chains
+MAX_LENGTH = 12
+# rounds of singles followed from an assumption in forcing_chains
+MAX_DEPTH = 6
+# seconds forcing_chains may take before giving up, None for no limit
+TIME_LIMIT = 0.25
+# assumptions forcing_chains may follow before giving up, for the Chains of
+# the rater, which needs the same outcome on any machine. A call follows at
+# most one per candidate, and 50 at most on the puzzles it was measured on
+MAX_ASSUMPTIONS = 400
+
+PEER_SETS = [frozenset(peers) for peers in PEERS]
+
+
+class LinkGraph:
+    """Strong and weak links between the candidates of one state of a grid.
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    masks          tuple            candidates of every square when the
+                                    graph was built
+
+    bivalues        list            squares with exactly two candidates
+
+    conjugates      list            for each number (index n - 1), the
+                                    pairs of squares of a set that are
+                                    the only two that can hold it
+
+    """
+    def __init__(self, grid):
+        self.masks = masks = tuple(grid.masks)
+        positions = grid.positions
+        self.bivalues = [index for index in range(81) if POPCOUNT[masks[index]] == 2]
+        self.conjugates = [[] for i in range(9)]
+        # square -> squares it is joined to by a strong link of each number
+        self._strong = [{} for i in range(9)]
+        # (square, number index) -> peers with the same candidate
+        self._weak = {}
+
+        for unit, cells in enumerate(UNIT_CELLS):
+            for i in range(9):
+                if POPCOUNT[positions[9 * unit + i]] == 2:
+                    first, second = (cells[pos] for pos in MASK_INDEXES[positions[9 * unit + i]])
+                    # a row or column pair inside a quadrant shows up in both sets
+                    if second not in self._strong[i].get(first, ()):
+                        self.conjugates[i].append((first, second))
+                        self._strong[i].setdefault(first, []).append(second)
+                        self._strong[i].setdefault(second, []).append(first)
+
+    def strong(self, index, i):
+        """returns the squares joined to square index by a strong link of number i + 1"""
+        return self._strong[i].get(index, ())
+
+    def weak(self, index, i):
+        """returns the peers of square index that have candidate i + 1"""
+        key = index, i
+        peers = self._weak.get(key)
+        if peers is None:
+            bit = 1 << i
+            masks = self.masks
+            peers = self._weak[key] = tuple(peer for peer in PEERS[index] if masks[peer] & bit)
+        return peers
+
+
+class Chains:
+    """Runs chain techniques on grids, see the module docstring.
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    length          int             longest xy chain, in squares
+
+    depth           int             rounds of singles followed from each
+                                    assumption of a forcing chain
+
+    time_limit      float or None   seconds one forcing_chains() call may
+                                    take before it gives up
+
+    assumptions     int or None     assumptions one forcing_chains() call
+                                    may follow before it gives up, which
+                                    unlike time_limit does not depend on
+                                    the speed of the machine
+
+    """
+    def __init__(self, length=MAX_LENGTH, depth=MAX_DEPTH, time_limit=TIME_LIMIT, assumptions=None):
+        self.length = length
+        self.depth = depth
+        self.time_limit = time_limit
+        self.assumptions = assumptions
+        # candidates of the grid state the graph was built for
+        self._key = None
+        self._graph = None
+
+    def graph(self, grid):
+        """returns the LinkGraph of the current state of grid, building it only
+            if the candidates changed since the last call"""
+        key = bytes(grid.masks)
+        if key != self._key:
+            self._key = key
+            self._graph = LinkGraph(grid)
+        return self._graph
+
+    def simple_coloring(self, grid):
+        """For every number, colours each group of squares joined by its strong
+            links with two alternating colours: the number is in every square
+            of one colour. If two squares of a colour share a set that colour
+            is false, and squares outside the group that see both colours
+            can not hold the number"""
+        graph = self.graph(grid)
+        masks = graph.masks
+
+        for i in range(9):
+            colours = {}
+            for start, second in graph.conjugates[i]:
+                if start in colours:
+                    continue
+
+                colours[start] = 0
+                groups = ([start], [])
+                stack = [start]
+                while stack:
+                    index = stack.pop()
+                    for linked in graph.strong(index, i):
+                        if linked not in colours:
+                            colours[linked] = 1 - colours[index]
+                            groups[colours[linked]].append(linked)
+                            stack.append(linked)
+
+                remove = []
+                for group in groups:
+                    members = set(group)
+                    if any(PEER_SETS[index] & members for index in group):
+                        remove = group
+                        break
+                else:
+                    seen = [set().union(*(PEER_SETS[index] for index in group)) for group in groups]
+                    remove = [index for index in seen[0] & seen[1]
+                              if masks[index] & 1 << i and index not in colours]
+
+                if remove:
+                    return self._eliminate(grid, [(index, 1 << i) for index in remove])
+
+        return 0
+
+    def xy_chains(self, grid):
+        """Follows chains of squares with two candidates from every such square
+            and each of its numbers x: if the start is not x its other number
+            y is true, so the next square (a peer with y) is its other
+            number, and so on. A square of the chain that turns out x means
+            one end or the other is x, so every square seeing both ends can
+            not be x"""
+        graph = self.graph(grid)
+        masks = graph.masks
+        bivalues = set(graph.bivalues)
+
+        for start in graph.bivalues:
+            for x in MASK_INDEXES[masks[start]]:
+                x_bit = 1 << x
+                # (square, number index it holds if start is not x)
+                level = [(start, LOWEST_BIT[masks[start] & ~x_bit])]
+                visited = {start}
+
+                for length in range(1, self.length):
+                    following = []
+                    for index, on in level:
+                        for peer in graph.weak(index, on):
+                            if peer in visited or peer not in bivalues:
+                                continue
+                            visited.add(peer)
+                            other = masks[peer] & ~(1 << on)
+                            if other == x_bit:
+                                remove = [index for index in PEER_SETS[start] & PEER_SETS[peer]
+                                          if masks[index] & x_bit]
+                                if remove:
+                                    return self._eliminate(grid, [(index, x_bit) for index in remove])
+                            following.append((peer, LOWEST_BIT[other]))
+                    level = following
+                    if not level:
+                        break
+
+        return 0
+
+    def forcing_chains(self, grid):
+        """For each strong link, assumes one side and then the other and follows
+            the singles from there for depth rounds. A candidate that none of
+            the sides that stay solvable leave is removed, which takes out the
+            side of a link that fails as well. Gives up after time_limit
+            seconds or once it has followed assumptions assumptions"""
+        graph = self.graph(grid)
+        deadline = None if self.time_limit is None else perf_counter() + self.time_limit
+        recording = grid.trail is not None
+        # (square, number) -> candidates of every square after assuming it,
+        # None if that fails
+        outcomes = {}
+
+        links = [tuple((index, number + 1) for number in MASK_INDEXES[graph.masks[index]])
+                 for index in graph.bivalues]
+        links += [((first, i + 1), (second, i + 1)) for i in range(9) for first, second in graph.conjugates[i]]
+
+        try:
+            for link in links:
+                if deadline is not None and perf_counter() > deadline:
+                    break
+                if self.assumptions is not None and len(outcomes) >= self.assumptions:
+                    break
+
+                sides = []
+                for side in link:
+                    if side not in outcomes:
+                        outcomes[side] = self._assume(grid, *side)
+                    if outcomes[side] is not None:
+                        sides.append(outcomes[side])
+
+                if not sides:
+                    grid.contradiction()
+                    return 0
+
+                masks = graph.masks
+                remove = []
+                for index in range(81):
+                    if masks[index]:
+                        kept = 0
+                        for candidates in sides:
+                            kept |= candidates[index]
+                        if masks[index] & ~kept:
+                            remove.append((index, masks[index] & ~kept))
+                if remove:
+                    return self._eliminate(grid, remove)
+        finally:
+            if not recording:
+                grid.trail = None
+
+        return 0
+
+    def _assume(self, grid, index, number):
+        """returns the candidates of every square (the number of a placed
+            square as its only candidate) after placing number in square index
+            and following depth rounds of singles, None if that fails. The
+            grid is left as it was"""
+        checkpoint = grid.checkpoint()
+        grid.place(index, number)
+
+        for depth in range(self.depth):
+            if not grid.solvable or not grid.naked_singles() + grid.hidden_singles():
+                break
+
+        candidates = [mask | NUMBER_BITS[number] for mask, number in zip(grid.masks, grid.numbers)] \
+            if grid.solvable else None
+        grid.undo(checkpoint)
+        return candidates
+
+    @staticmethod
+    def _eliminate(grid, removals):
+        """removes the candidates of each (square, mask) of removals from grid,
+            returns the number of candidates removed"""
+        removed = 0
+        for index, mask in removals:
+            removed += POPCOUNT[grid.masks[index] & mask]
+            if not grid.eliminate(index, mask):
+                break
+        return removed
+
+
+DEFAULT_CHAINS = Chains()
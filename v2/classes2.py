@@ -1,52 +1,164 @@
-import pygame
-pygame.init()
-
 from datetime import datetime
 from datetime import timedelta
 from datetime import date
+from array import array
+from collections import Counter
+from operator import itemgetter
+import random
+
+# candidate masks: bit (n - 1) is set while the number n is still a candidate
+ALL_CANDIDATES = 0x1FF
+# mask bit of each number, 0 for an empty square
+NUMBER_BITS = [0] + [1 << i for i in range(9)]
+# number of candidates in each of the 512 possible masks
+POPCOUNT = [bin(mask).count("1") for mask in range(512)]
+# index (number - 1) of the lowest candidate in each mask, -1 for an empty mask
+LOWEST_BIT = [(mask & -mask).bit_length() - 1 for mask in range(512)]
+# indexes (number - 1) of every candidate in each mask
+MASK_INDEXES = [tuple(i for i in range(9) if mask >> i & 1) for mask in range(512)]
+
+# index tables shared by every grid. Squares are indexed 9 * row + col and
+# sets of 9 squares are indexed rows 0-8, columns 9-17, quadrants 18-26
+
+# square indexes of each set, quadrants in the order shown in the Grid docstring
+UNIT_CELLS = [tuple(9 * unit + i for i in range(9)) for unit in range(9)] + \
+             [tuple(9 * i + unit for i in range(9)) for unit in range(9)] + \
+             [tuple(9 * (unit // 3 * 3 + i // 3) + unit % 3 * 3 + i % 3 for i in range(9))
+              for unit in range(9)]
+# getters of the masks (or numbers) of the squares of each set, as a tuple
+UNIT_MASKS = [itemgetter(*cells) for cells in UNIT_CELLS]
+# row, column and quadrant set of each square
+CELL_UNITS = [tuple(unit for unit in range(27) if i in UNIT_CELLS[unit]) for i in range(81)]
+# indexes of the 20 other squares sharing a set with each square
+PEERS = [tuple(sorted(set(UNIT_CELLS[row] + UNIT_CELLS[col] + UNIT_CELLS[quad]) - {i}))
+         for i, (row, col, quad) in enumerate(CELL_UNITS)]
+# (9 * set, bit of the square's position in the set) for the 3 sets of each square,
+# used to index the per-set counts and position masks kept by a Grid
+CELL_SLOTS = [tuple((9 * unit, 1 << UNIT_CELLS[unit].index(i)) for unit in CELL_UNITS[i])
+              for i in range(81)]
+# positions in each square's quadrant of the squares sharing neither its row nor its column,
+# so a square's peers are its row, its column and these
+QUAD_OTHERS = [sum(1 << pos for pos, peer in enumerate(UNIT_CELLS[CELL_UNITS[i][2]])
+                   if peer // 9 != i // 9 and peer % 9 != i % 9)
+               for i in range(81)]
+# (quadrant set, row or column set, positions in the quadrant of the squares it
+# shares with the line, positions in the line of those squares) for each of
+# the 54 intersections of a quadrant with a row or column crossing it
+INTERSECTIONS = [(quad, line,
+                  sum(1 << pos for pos, i in enumerate(UNIT_CELLS[quad]) if i in UNIT_CELLS[line]),
+                  sum(1 << pos for pos, i in enumerate(UNIT_CELLS[line]) if i in UNIT_CELLS[quad]))
+                 for quad in range(18, 27) for line in range(18)
+                 if set(UNIT_CELLS[quad]) & set(UNIT_CELLS[line])]
+# CONFINED[unit][positions] lists (other set, positions in it of the shared
+# squares) for every intersection of the set unit that holds all of positions,
+# so a number with those positions in unit can be removed from the rest of the other set
+CONFINED = [[() for positions in range(512)] for unit in range(27)]
+for quad, line, quad_shared, line_shared in INTERSECTIONS:
+    for source, target, source_shared, target_shared in ((quad, line, quad_shared, line_shared),
+                                                         (line, quad, line_shared, quad_shared)):
+        for positions in range(1, 512):
+            if not positions & ~source_shared:
+                CONFINED[source][positions] += ((target, target_shared),)
+
+# getters of the positions of number n (index n - 1) in every row (LINE_POSITIONS[0][n - 1])
+# or column (LINE_POSITIONS[1][n - 1]) of a Grid, as a tuple of 9 column (or row) masks
+LINE_POSITIONS = [[itemgetter(*(9 * line + i for line in range(base, base + 9))) for i in range(9)]
+                  for base in (0, 9)]
+
+# layout of the flat state buffer of a Grid, see Grid.set_state
+STATE_NUMBERS = 0
+STATE_MASKS = 81
+STATE_COUNTS = 162
+STATE_POSITIONS = 405
+STATE_USED = 648
+STATE_FLAGS = 675
+STATE_SIZE = 756
+EMPTY_STATE = array("H", [0]) * STATE_SIZE
+# counts of a solved grid, where every set holds every number once
+SOLVED_COUNTS = (array("H", [1]) * 243).tobytes()
+# square flags
+LOCKED = 1
+CONFLICT = 2
+# trail entry recorded when a grid becomes unsolvable, see Grid
+SOLVABLE_MARK = ~81
 
 
 class Square:
-    """Represents a square on a Sudoku grid. Holds a number and
-    a list of candidate numbers.
+    """Represents a square on a Sudoku grid. A thin view of one square of
+    the state buffer of a Grid, holding a number and the candidate numbers.
     
     Properties:
     
     variable       |type           |description
     ------------------------------------------------------------
-    num             int
+    number          int
+    
+    mask            int (bit i set if i + 1 is a candidate)
     
-    candidate       list of int
+    candidates      list of bool (view of mask)
     
     locked          bool
     
     """
-    def __init__(self, pos, number, locked=False):
-    
-        self.number = number
-        self.candidates = [number == 0] * 9
-        self.locked = locked
-        
-        self.pos = pos
-        self.has_conflict = False
+    __slots__ = ("grid", "index")
+
+    def __init__(self, grid, index):
+        self.grid = grid
+        self.index = index
+
+    @property
+    def pos(self):
+        return [self.index // 9, self.index % 9]
+
+    @property
+    def number(self):
+        return self.grid.numbers[self.index]
+
+    @property
+    def mask(self):
+        return self.grid.masks[self.index]
+
+    @mask.setter
+    def mask(self, mask):
+        self.grid.set_mask(self.index, mask)
+
+    @property
+    def candidates(self):
+        """list of 9 bools built from the candidate mask, kept for compatibility"""
+        return [bool(self.mask >> i & 1) for i in range(9)]
+
+    @candidates.setter
+    def candidates(self, candidates):
+        self.mask = sum(1 << i for i in range(9) if candidates[i])
+
+    @property
+    def locked(self):
+        return bool(self.grid.flags[self.index] & LOCKED)
+
+    @locked.setter
+    def locked(self, locked):
+        self.grid.set_flag(self.index, LOCKED, locked)
+
+    @property
+    def has_conflict(self):
+        return bool(self.grid.flags[self.index] & CONFLICT)
+
+    @has_conflict.setter
+    def has_conflict(self, has_conflict):
+        self.grid.set_flag(self.index, CONFLICT, has_conflict)
 
     def reset_candidates(self):
         if self.number == 0:
-            self.candidates = [True] * 9
+            self.grid.update_mask(self.index)
 
     def set_number(self, number):
-        if not self.locked and self.candidates[number - 1]:
-            self.candidates = [False] * 9
-            self.number = number
-            self.has_conflict = False
+        self.grid.set_square(self.pos, number, override_candidates=False)
 
     def set_conflict(self):
         self.has_conflict = True
 
     def reset(self):
-        if not self.locked:
-            self.number = 0
-            self.reset_candidates()
+        self.grid.set_square(self.pos, 0)
 
 
 class Grid:
@@ -60,107 +172,302 @@ class Grid:
     ---------
     6 | 7 | 8
     
+    The whole grid is held in one flat array('H') laid out as described by
+    the STATE_* constants, with memoryviews over each part, so copy() is a
+    single buffer copy. Square objects and the rows, cols and quadrants
+    lists are only built when they are first used.
+
+    While trail is a list, every place() and set_mask() (and so every
+    technique) records what it changed on it, and undo(checkpoint) puts
+    the grid back the way it was at checkpoint(). Entries are ints:
+        index << 9 | old mask       the mask of square index was changed
+        ~index                      a number was placed in square index
+        SOLVABLE_MARK               the grid became unsolvable
+    unplace() and assign_candidates() are not recorded.
     """
+    __slots__ = ("state", "numbers", "masks", "counts", "positions", "used", "flags",
+                 "solvable", "show_conflicts", "show_candidates", "trail", "_squares", "_units")
 
-    # fonts for displaying grid on a surface
-    FONT = pygame.font.SysFont("Ariel", 50)             # for numbers
-    SMALL_FONT = pygame.font.SysFont("Ariel", 15)       # for candidates
+    # fonts for displaying grid on a surface, created by load_fonts() on the first draw
+    FONT = None             # for numbers
+    SMALL_FONT = None       # for candidates
     # offsets for displaying candidates
     OFFSETS = [(0, 0), (15, 0), (30, 0), (0, 15), (15, 15), (30, 15), (0, 30), (15, 30), (30, 30)]
+    # techniques solve() tries, cheapest first, once there are no singles left
+    LOGIC_PASSES = ("pointing", "box_line", "naked_doubles", "x_wing", "hidden_doubles",
+                    "naked_triples", "swordfish", "hidden_triples", "simple_coloring", "naked_quads",
+                    "jellyfish", "hidden_quads", "xy_chains", "forcing_chains")
+    # techniques search.propagate() runs at every node, where the bigger
+    # subsets cost more time than the branches they save
+    SEARCH_PASSES = ("pointing", "box_line", "naked_doubles", "hidden_doubles")
 
     def __init__(self, grid, show_conflicts=True, show_candidates=True):
-        def __fill_lists(self):
-            for i in range(9):
-                self.rows.append([])
-                self.cols.append([])
-                self.quadrants.append([])
         """
         grid is of form
         
             list of lists of int with dimensions 9x9
         """
-        self.rows = []
-        self.cols = []
-        self.quadrants = []
-        
         self.solvable = True
         self.show_conflicts = show_conflicts
         self.show_candidates = show_candidates
-    
-        __fill_lists(self)
-    
+        self.trail = None
+
+        self.set_state(array("H", EMPTY_STATE))
         for i in range(81):
-            row = i // 9
-            col = i % 9 
-            quad_num = col // 3 + 3 * (row // 3)
-        
-            square = Square([row, col], number=grid[row][col])
+            self.numbers[i] = grid[i // 9][i % 9]
+
+        self.assign_candidates()
 
-            self.rows[row].append(square)
-            self.cols[col].append(square)
-            self.quadrants[quad_num].append(square)
+    def set_state(self, state):
+        """Makes the grid use the flat state buffer state"""
+        view = memoryview(state)
+        self.state = state
+        # numbers[i] is the number in square i, 0 if it is empty, and
+        # masks[i] has bit n - 1 set if n is a candidate of square i
+        self.numbers = view[STATE_NUMBERS:STATE_MASKS]
+        self.masks = view[STATE_MASKS:STATE_COUNTS]
+        # for the set unit and number n, with index = 9 * unit + n - 1:
+        #   counts[index] is how many squares of the set hold n
+        #   positions[index] has bit i set if square i of the set has candidate n
+        # and used[unit] is the mask of the numbers placed in the set
+        self.counts = view[STATE_COUNTS:STATE_POSITIONS]
+        self.positions = view[STATE_POSITIONS:STATE_USED]
+        self.used = view[STATE_USED:STATE_FLAGS]
+        # LOCKED and CONFLICT bits of every square
+        self.flags = view[STATE_FLAGS:STATE_SIZE]
+        self._squares = None
+        self._units = None
+
+    def copy(self):
+        """returns an independent copy of the grid, made by copying its state buffer"""
+        new_grid = Grid.__new__(Grid)
+        new_grid.solvable = self.solvable
+        new_grid.show_conflicts = self.show_conflicts
+        new_grid.show_candidates = self.show_candidates
+        new_grid.trail = None
+        new_grid.set_state(array("H", self.state))
+        return new_grid
+
+    def __getstate__(self):
+        # the memoryviews cannot be pickled, they are rebuilt from the buffer
+        return self.state, self.solvable, self.show_conflicts, self.show_candidates
+
+    def __setstate__(self, state):
+        buffer, self.solvable, self.show_conflicts, self.show_candidates = state
+        self.trail = None
+        self.set_state(buffer)
+
+    @property
+    def squares(self):
+        """list of the 81 squares, by index 9 * row + col"""
+        if self._squares is None:
+            self._squares = [Square(self, i) for i in range(81)]
+        return self._squares
+
+    @property
+    def units(self):
+        """every set of 9 squares, in the order of UNIT_CELLS"""
+        if self._units is None:
+            squares = self.squares
+            self._units = [[squares[i] for i in cells] for cells in UNIT_CELLS]
+        return self._units
+
+    @property
+    def rows(self):
+        return self.units[:9]
+
+    @property
+    def cols(self):
+        return self.units[9:18]
+
+    @property
+    def quadrants(self):
+        return self.units[18:]
+
+    def set_flag(self, index, flag, value):
+        if value:
+            self.flags[index] |= flag
+        else:
+            self.flags[index] &= ~flag
     
     def assign_candidates(self):
-        # check the grid and assign squares their candidates numbers
-        def assign_set(set_list):
-            for _set in set_list:
-            
-                nums = [sq.number - 1 for sq in _set if sq.number != 0]
-                
-                for square in _set:
-                    
-                    for num in nums:
-                        square.candidates[num] = False 
-                    
-                    if square.number == 0 and square.candidates.count(True) == 0:
-                        self.solvable = False
-       
-        self.reset_candidates()
-        assign_set(self.rows)
-        assign_set(self.cols)
-        assign_set(self.quadrants)
+        """Rebuilds the set counts, positions and the candidates of every square
+            from scratch"""
+        numbers, masks, counts, positions, used = \
+            self.numbers, self.masks, self.counts, self.positions, self.used
+        self.state[STATE_MASKS:STATE_FLAGS] = EMPTY_STATE[STATE_MASKS:STATE_FLAGS]
+
+        for i in range(81):
+            if numbers[i] != 0:
+                for unit in CELL_UNITS[i]:
+                    counts[9 * unit + numbers[i] - 1] += 1
+                    used[unit] |= NUMBER_BITS[numbers[i]]
+
+        for i in range(81):
+            if numbers[i] == 0:
+                row, col, quad = CELL_UNITS[i]
+                masks[i] = mask = ALL_CANDIDATES & ~(used[row] | used[col] | used[quad])
+
+                for base, bit in CELL_SLOTS[i]:
+                    for n in MASK_INDEXES[mask]:
+                        positions[base + n] |= bit
+
+                if mask == 0:
+                    self.solvable = False
+
+        # a number missing from a set that no square of the set can hold
+        for index in range(243):
+            if positions[index] == 0 and counts[index] == 0:
+                self.solvable = False
+
+    def set_mask(self, index, mask):
+        """Sets the candidates of square index to mask and updates the positions
+            of the changed numbers in its sets. Returns False as soon as the
+            square, or a number in one of its sets, is left with nowhere to go"""
+        changed = self.masks[index] ^ mask
+
+        if changed:
+            if self.trail is not None:
+                self.trail.append(index << 9 | self.masks[index])
+
+            self.masks[index] = mask
+            positions = self.positions
+            counts = self.counts
+
+            for base, bit in CELL_SLOTS[index]:
+                for i in MASK_INDEXES[changed]:
+                    positions[base + i] ^= bit
+                    if positions[base + i] == 0 and counts[base + i] == 0:
+                        self.contradiction()
+
+            if mask == 0 and self.numbers[index] == 0:
+                self.contradiction()
+
+        return self.solvable
+
+    def contradiction(self):
+        """Marks the grid as no longer solvable"""
+        if self.solvable and self.trail is not None:
+            self.trail.append(SOLVABLE_MARK)
+        self.solvable = False
+
+    def eliminate(self, index, mask):
+        """Removes the candidates in mask from square index"""
+        return self.set_mask(index, self.masks[index] & ~mask)
+
+    def update_mask(self, index):
+        """Gives an empty square every number not yet used in its row, column
+            and quadrant"""
+        used = self.used
+        row, col, quad = CELL_UNITS[index]
+        self.set_mask(index, ALL_CANDIDATES & ~(used[row] | used[col] | used[quad]))
+
+    def place(self, index, number):
+        """Puts number in empty square index and removes it from the candidates
+            of the square's peers. Returns False as soon as the placement leaves
+            a square or a number with nowhere to go, which means the grid can no
+            longer be solved"""
+        bit = NUMBER_BITS[number]
+        masks = self.masks
+        if self.trail is not None:
+            self.trail.append(~index)
+
+        self.numbers[index] = number
+        self.flags[index] &= ~CONFLICT
+
+        for unit in CELL_UNITS[index]:
+            self.counts[9 * unit + number - 1] += 1
+            self.used[unit] |= bit
+
+        self.set_mask(index, 0)
+        for peer in PEERS[index]:
+            if masks[peer] & bit:
+                self.set_mask(peer, masks[peer] & ~bit)
+
+        return self.solvable
+
+    def unplace(self, index):
+        """Empties square index and gives it and its peers back any number that
+            no longer appears in their sets"""
+        number = self.numbers[index]
+        self.numbers[index] = 0
+
+        for unit in CELL_UNITS[index]:
+            i = 9 * unit + number - 1
+            self.counts[i] -= 1
+            if self.counts[i] == 0:
+                self.used[unit] &= ~NUMBER_BITS[number]
+
+        self.update_mask(index)
+        for peer in PEERS[index]:
+            if self.numbers[peer] == 0:
+                self.update_mask(peer)
+
+    def checkpoint(self):
+        """Starts recording changes if the grid was not already, and returns a
+            checkpoint that undo() can return to"""
+        if self.trail is None:
+            self.trail = []
+        return len(self.trail)
+
+    def undo(self, checkpoint):
+        """Unwinds the trail, reversing every recorded change made since checkpoint"""
+        trail = self.trail
+        numbers, masks, counts, positions, used = \
+            self.numbers, self.masks, self.counts, self.positions, self.used
+
+        while len(trail) > checkpoint:
+            entry = trail.pop()
+
+            if entry >= 0:
+                index = entry >> 9
+                changed = masks[index] ^ (entry & ALL_CANDIDATES)
+                masks[index] ^= changed
+                for base, bit in CELL_SLOTS[index]:
+                    for i in MASK_INDEXES[changed]:
+                        positions[base + i] ^= bit
+
+            elif entry == SOLVABLE_MARK:
+                self.solvable = True
+
+            else:
+                index = ~entry
+                number = numbers[index]
+                numbers[index] = 0
+                for unit in CELL_UNITS[index]:
+                    i = 9 * unit + number - 1
+                    counts[i] -= 1
+                    if counts[i] == 0:
+                        used[unit] &= ~NUMBER_BITS[number]
     
     def reset_candidates(self):
-        for row in self.rows:
-            for square in row:
-                square.reset_candidates()
+        for i in range(81):
+            if self.numbers[i] == 0:
+                self.update_mask(i)
 
     def is_solved(self):
-        def sum_squares(squares):
-            return sum(square.number for square in squares)
-    
-        """This function checks and returns if the grid has been solved"""
-        
-        for i in range(9):
-            if sum_squares(self.rows[i]) != 45 or \
-                    sum_squares(self.quadrants[i]) != 45 or \
-                    sum_squares(self.cols[i]) != 45:\
-
-                return False
-        return True
+        """This function checks and returns if the grid has been solved,
+            which is when every set holds every number exactly once"""
+        return self.counts.tobytes() == SOLVED_COUNTS
 
     def copy_grid(self):
         """This function prints and returns the grid as a list of numbers"""
-        new_list = []
-        for i in range(9):
-            new_list.append([])
-            for j in range(9):
-                new_list[i].append(self.rows[i][j].number)
-
-        return new_list
+        numbers = self.numbers.tolist()
+        return [numbers[9 * row:9 * row + 9] for row in range(9)]
 
     def set_square(self, pos, number, override_candidates=True):
         """This function sets the square at pos to number"""
-        square = self.rows[pos[0]][pos[1]]
-        
-        if number == 0:
-            square.reset()
-        else:
-            if override_candidates:
-                square.reset()
-            square.set_number(number)
-        
-        self.assign_candidates()
+        index = 9 * pos[0] + pos[1]
+
+        if self.flags[index] & LOCKED:
+            return
+
+        if self.numbers[index] != 0 and (number == 0 or override_candidates):
+            self.unplace(index)
+
+        if number != 0 and self.numbers[index] == 0 and \
+                (override_candidates or self.masks[index] & NUMBER_BITS[number]):
+            self.place(index, number)
 
     def set_board(self):
         """This method sets all the current squares on the board and makes
@@ -170,8 +477,19 @@ class Grid:
                 if j.number != 0:
                     j.locked = True
 
+    @classmethod
+    def load_fonts(cls):
+        """Creates the fonts the first time a grid is drawn, so pygame is only
+            needed (and imported) by programs that draw grids"""
+        if cls.FONT is None:
+            import pygame
+            pygame.font.init()
+            cls.FONT = pygame.font.SysFont("Ariel", 50)
+            cls.SMALL_FONT = pygame.font.SysFont("Ariel", 15)
+
     def draw(self, screen, is_solve=True):
         """This function draws the Grid onto the passed surface. Draws the possibilities if is_solve is True"""
+        self.load_fonts()
         for row in range(len(self.rows)):
             for col in range(len(self.rows[row])):
                 square = self.rows[row][col]
@@ -184,12 +502,11 @@ class Grid:
 
                 elif is_solve or self.show_candidates:
                     
-                    for i in range(len(square.candidates)):
-                        if square.candidates[i]:
-                            number = self.SMALL_FONT.render(str(i + 1), True, (255, 255, 255))
-                            x_offset, y_offset = self.OFFSETS[i]
-                            screen.blit(number, (30 + 50 * col + x_offset,
-                                                 30 + 50 * row + y_offset))
+                    for i in MASK_INDEXES[square.mask]:
+                        number = self.SMALL_FONT.render(str(i + 1), True, (255, 255, 255))
+                        x_offset, y_offset = self.OFFSETS[i]
+                        screen.blit(number, (30 + 50 * col + x_offset,
+                                             30 + 50 * row + y_offset))
 
     def clear(self):
         """This function clears the Grid"""
@@ -217,174 +534,270 @@ class Grid:
                     square_list[seen_numbers.index(num)].has_conflict = True
                     self.solvable = False
                 
-                elif square.number == 0 and square.candidates.count(True) == 0:
+                elif square.number == 0 and square.mask == 0:
                     self.solvable = False
                         
                 seen_numbers.append(square.number)
                 
         return self.solvable
     
-    def solve(self):                    
+    def solve(self, brancher=None):
         if not self.is_solved():
-            i = False
-
             if not self.solve_singles() and self.solvable:      # no singles to solve, still solvable
-                if not self.naked_doubles():                   # if no paired doubles
-                    # if there are no singles to be solved and the grid can still be solved, brute force
-                    if not self.naked_triples():
-                        return self.brute_force(2)
-                    # i is a list of different grid possibilities
-            else:
-                # if a single was solved
-                self.assign_candidates()
-            return i
-
-    def solve_singles(self):
-        """Solve naked singles"""
-        ret_val = False
-        
-        for row in self.rows:
-            indexes = find_occurrences(row)
-            
-            for i in range(9):
-                current_square = row[i]
-                
-                if current_square.candidates.count(True) == 1:
-                    
-                    current_square.set_number(current_square.candidates.index(True) + 1)
-                    self.assign_candidates()
-                    
-                    if not self.solvable:
-                        # solve a single and fail check means we know the current grid is
-                        # wrong, return False
-                        row[i].reset()
-                        self.assign_candidates()
+                # try the other techniques, cheapest first, and stop at the first one
+                # that removes any candidates
+                for technique in self.LOGIC_PASSES:
+                    if getattr(self, technique)() or not self.solvable:
                         return False
-                    else:
-                        ret_val = True
-                    
-                if len(indexes[i]) == 1:
-                    row[indexes[i][0]].set_number(i + 1)
-                    self.assign_candidates()
-                    
-                    if not self.solvable:
-                        # solve a single and fail check means we know the current grid is
-                        # wrong, return False
-                        row[indexes[i][0]].reset()
-                        self.assign_candidates()
-                        return False
-                    else:
-                        ret_val = True
-        
-        remaining_sq = self.cols + self.quadrants
-        
-        for square_list in remaining_sq:
-            indexes = find_occurrences(square_list)
+                # if there are no singles to be solved and the grid can still be solved, brute force
+                # a list of different grid possibilities
+                return self.brute_force(brancher)
+            return False
 
-            for i in range(9):
-                current_square = square_list[i]
-                
-                # the only square in the list that can have the number
-                if len(indexes[i]) == 1:
-                    square_list[indexes[i][0]].set_number(i + 1)
-                    self.assign_candidates()
-                    
-                    if not self.solvable:
-                        # solve a single and fail check means we know the current grid is
-                        # wrong, return False
-                        square_list[indexes[i][0]].reset()
-                        self.assign_candidates()
-                        return False
-                    else:
-                        ret_val = True
+    def solve_singles(self):
+        """Solve naked and hidden singles. Every placement only updates the peers
+            of the square, and a placement that leaves a square or a number
+            without candidates means the current grid is wrong, so return False"""
+        ret_val = self.naked_singles() > 0
+        if not self.solvable:
+            return False
+
+        ret_val = self.hidden_singles() > 0 or ret_val
         # if it goes through every row, column, and group and cannot find any singles return False
         # so it starts brute forcing
-        return ret_val
-    
-    def naked_doubles(self):
-        ret_val = False
-        
-        for _set_ in self.rows + self.cols + self.quadrants:
-            """solve paired doubles"""
-            # for each set of 9 squares
-            # list of all candidates for squares in the set
-            cands = [sq.candidates for sq in _set_]
-            
-            # for each square in the set
-            for i in range(8):
-                # if the square has only 2 candidates and 
-                # another square only has the same two candidates
-                if cands[i].count(True) == 2 and \
-                        cands.count(cands[i]) == 2:
-                    # retrieve the candidate values
-                    can1 = cands[i].index(True)
-                    can2 = cands[i].index(True, can1 + 1)
-                    
-                    # remove those candidates from the other squares
-                    # in the set becuase those two values must be
-                    # in those two squares
-                    for sq in [sq for sq in _set_ if sq.candidates != cands[i]]:
-                        
-                        if sq.candidates[can1] or sq.candidates[can2]:
-                            ret_val = True
+        return ret_val and self.solvable
 
-                            sq.candidates[can1] = False
-                            sq.candidates[can2] = False
+    def naked_singles(self):
+        """Places every square that has a single candidate left. Returns the number
+            of squares placed, stopping as soon as the grid is not solvable"""
+        placed = 0
+        masks = self.masks
 
-        return ret_val
-    
-    def naked_triples(self):
-        ret_val = False
-        
-        for _set_ in self.rows + self.cols + self.quadrants:
-            # for each set of 9 squares
-            # list of all candidates for squares in the set
-            cands = [sq.candidates for sq in _set_]
-            
-            # for each square in the set
-            for i in range(7):
-                # if the square has only 2 candidates and 
-                # another square only has the same two candidates
-                if cands[i].count(True) == 3 and \
-                        cands.count(cands[i]) == 3:
-                    # retrieve the candidate values
-                    can1 = cands[i].index(True)
-                    can2 = cands[i].index(True, can1 + 1)
-                    can3 = cands[i].index(True, can2 + 1)
-                    
-                    # remove those candidates from the other squares
-                    # in the set becuase those two values must be
-                    # in those two squares
-                    for sq in [sq for sq in _set_ if sq.candidates != cands[i]]:
-                        if sq.candidates[can1] or sq.candidates[can2] or sq.candidates[can3]:
-                            ret_val = True
-                            sq.candidates[can1] = False
-                            sq.candidates[can2] = False
-                            sq.candidates[can3] = False
+        for i in range(81):
+            if POPCOUNT[masks[i]] == 1:
+                if not self.place(i, LOWEST_BIT[masks[i]] + 1):
+                    return placed
+                placed += 1
+
+        return placed
+
+    def hidden_singles(self):
+        """Places every number that only one square of a set can hold. Returns the
+            number of squares placed, stopping as soon as the grid is not solvable"""
+        placed = 0
+        positions = self.positions
+        counts = self.counts
+
+        for index in range(243):
+            # the only square in the set that can have the number
+            if POPCOUNT[positions[index]] == 1 and counts[index] == 0:
+                square = UNIT_CELLS[index // 9][LOWEST_BIT[positions[index]]]
+                if not self.place(square, index % 9 + 1):
+                    return placed
+                placed += 1
+
+        return placed
+
+    def pointing(self):
+        """solve pointing pairs and triples, returns the number of candidates removed"""
+        return self.intersection_removal(True)
+
+    def box_line(self):
+        """solve box/line reductions, returns the number of candidates removed"""
+        return self.intersection_removal(False)
+
+    def intersection_removal(self, pointing):
+        """For every quadrant and row or column crossing it, finds the numbers
+            that one of them can only hold in the squares they share. If
+            pointing is True these are numbers of the quadrant, which are then
+            removed from the rest of the line, otherwise numbers of the line,
+            removed from the rest of the quadrant. Returns the number of
+            candidates removed"""
+        removed = 0
+        positions = self.positions
+
+        for unit in range(18, 27) if pointing else range(18):
+            confined = CONFINED[unit]
+            for i in range(9):
+                # the number has to go in the squares unit shares with target,
+                # so the rest of target can not have it
+                for target, shared in confined[positions[9 * unit + i]]:
+                    cells = UNIT_CELLS[target]
+                    for pos in MASK_INDEXES[positions[9 * target + i] & ~shared]:
+                        removed += 1
+                        if not self.eliminate(cells[pos], 1 << i):
+                            return removed
 
-        return ret_val
-    
-    def brute_force(self, target):
-        """This function finds x number of possible boards and returns them all"""
+        return removed
+
+    def naked_doubles(self):
+        """solve naked pairs, returns the number of candidates removed"""
+        return self.naked_subset(2)
+
+    def naked_triples(self):
+        """solve naked triples, returns the number of candidates removed"""
+        return self.naked_subset(3)
+
+    def naked_quads(self):
+        """solve naked quads, returns the number of candidates removed"""
+        return self.naked_subset(4)
+
+    def naked_subset(self, size):
+        """Finds size squares in a set whose candidates together are only size
+            numbers (like {1, 2}, {2, 3} and {1, 3}), which must then hold those
+            numbers, and removes them from the rest of the set. Returns the
+            number of candidates removed"""
+        removed = 0
+        masks = self.masks
+
+        for cells, unit_masks in zip(UNIT_CELLS, UNIT_MASKS):
+            unit = unit_masks(masks)
+            # a subset needs at least one other empty square to remove anything from
+            if unit.count(0) + size >= 9:
+                continue
+
+            found = _subset_cache.get((size, unit))
+            if found is None:
+                found = find_subsets(unit, size)
+                if len(_subset_cache) >= SUBSET_CACHE_SIZE:
+                    _subset_cache.clear()
+                _subset_cache[size, unit] = found
+
+            for union, chosen in found:
+                for i, index in enumerate(cells):
+                    mask = masks[index]
+                    if mask & union and not chosen >> i & 1:
+                        removed += POPCOUNT[mask & union]
+                        if not self.set_mask(index, mask & ~union):
+                            return removed
+
+        return removed
+
+    def hidden_doubles(self):
+        """solve hidden pairs, returns the number of candidates removed"""
+        return self.hidden_subset(2)
+
+    def hidden_triples(self):
+        """solve hidden triples, returns the number of candidates removed"""
+        return self.hidden_subset(3)
+
+    def hidden_quads(self):
+        """solve hidden quads, returns the number of candidates removed"""
+        return self.hidden_subset(4)
+
+    def hidden_subset(self, size):
+        """Finds size numbers in a set that together can only go in size of its
+            squares, which must then hold those numbers, and removes every
+            other candidate from those squares. Returns the number of
+            candidates removed.
+            This is naked_subset() with squares and numbers swapped: the
+            positions of the numbers take the place of the candidates of the
+            squares"""
+        removed = 0
+        masks = self.masks
+        positions = self.positions
+
+        for unit, cells in enumerate(UNIT_CELLS):
+            unit_positions = tuple(positions[9 * unit:9 * unit + 9])
+            # the set needs at least one other number left to remove
+            if unit_positions.count(0) + size >= 9:
+                continue
+
+            found = _subset_cache.get((size, unit_positions))
+            if found is None:
+                found = find_subsets(unit_positions, size)
+                if len(_subset_cache) >= SUBSET_CACHE_SIZE:
+                    _subset_cache.clear()
+                _subset_cache[size, unit_positions] = found
+
+            # union is the squares the numbers of chosen are confined to
+            for union, chosen in found:
+                for i in MASK_INDEXES[union]:
+                    index = cells[i]
+                    mask = masks[index]
+                    if mask & ~chosen:
+                        removed += POPCOUNT[mask & ~chosen]
+                        if not self.set_mask(index, mask & chosen):
+                            return removed
+
+        return removed
+
+    def x_wing(self):
+        """solve X-Wings, returns the number of candidates removed"""
+        return self.fish(2)
+
+    def swordfish(self):
+        """solve swordfish, returns the number of candidates removed"""
+        return self.fish(3)
+
+    def jellyfish(self):
+        """solve jellyfish, returns the number of candidates removed"""
+        return self.fish(4)
+
+    def fish(self, size):
+        """Finds size rows (the base) where a number can only go in size
+            columns (the cover), so those columns have it in the base rows,
+            and removes it from the cover columns in every other row. The
+            same with rows and columns swapped. Returns the number of
+            candidates removed.
+            The positions of a number in each row are the column masks, so
+            this is naked_subset() over them, with the base as the squares
+            and the cover as the candidates"""
+        removed = 0
+        positions = self.positions
+
+        for base, cover in ((0, 9), (9, 0)):
+            for i, line_positions in enumerate(LINE_POSITIONS[base // 9]):
+                lines = line_positions(positions)
+                # another line needs the number for anything to be removed
+                if lines.count(0) + size >= 9:
+                    continue
+
+                found = _subset_cache.get((size, lines))
+                if found is None:
+                    found = find_subsets(lines, size)
+                    if len(_subset_cache) >= SUBSET_CACHE_SIZE:
+                        _subset_cache.clear()
+                    _subset_cache[size, lines] = found
+
+                for cover_lines, base_lines in found:
+                    for line in MASK_INDEXES[cover_lines]:
+                        cells = UNIT_CELLS[cover + line]
+                        for pos in MASK_INDEXES[positions[9 * (cover + line) + i] & ~base_lines]:
+                            removed += 1
+                            if not self.eliminate(cells[pos], 1 << i):
+                                return removed
+
+        return removed
+
+    def simple_coloring(self):
+        """solve simple colouring, returns the number of candidates removed"""
+        import chains
+        return chains.DEFAULT_CHAINS.simple_coloring(self)
+
+    def xy_chains(self):
+        """solve xy chains, returns the number of candidates removed"""
+        import chains
+        return chains.DEFAULT_CHAINS.xy_chains(self)
+
+    def forcing_chains(self):
+        """solve forcing chains (within the depth and time limits of
+            chains.DEFAULT_CHAINS), returns the number of candidates removed"""
+        import chains
+        return chains.DEFAULT_CHAINS.forcing_chains(self)
+
+    def brute_force(self, brancher=None):
+        """This function returns a copy of the grid for every alternative of the
+            pivot chosen by brancher (DEFAULT_BRANCHER if None), with that
+            alternative placed"""
         grids = []
-        
-        self.assign_candidates()
-        
-        for quadrant in self.quadrants:           # check every group in the grid
-            
-            indexes = find_occurrences(quadrant)
-            
-            for i in range(9):
-                if len(indexes[i]) == target:
-                    for index in indexes[i]:
-                        
-                        new_grid = Grid(self.copy_grid())
-                        new_grid.set_square(quadrant[index].pos, i + 1)
-                        new_grid.assign_candidates()
-                        grids.append(new_grid)
-                            
-                    return grids
-        return self.brute_force(target + 1)
+
+        for index, number in (brancher or DEFAULT_BRANCHER).choose(self):
+            new_grid = self.copy()
+            new_grid.place(index, number)
+            grids.append(new_grid)
+
+        return grids
         
     def __str__(self):
         ret_val = ""
@@ -393,6 +806,44 @@ class Grid:
         return ret_val
         
 
+# subsets found by find_subsets, by (size, masks of the set) where the masks
+# are the candidates or the positions of the numbers of a set, as the same sets
+# come up again and again while solving. Cleared once it holds SUBSET_CACHE_SIZE
+_subset_cache = {}
+SUBSET_CACHE_SIZE = 1 << 16
+
+
+def find_subsets(unit, size):
+    """returns (union, chosen) for every size squares of a set, with candidate
+        masks unit, whose candidates together are only size numbers. union is
+        those numbers and chosen has bit i set for square i of the set.
+        Squares are added one at a time and a branch is dropped as soon as
+        its union has more than size numbers"""
+    if size == 2:
+        # two squares only have 2 candidates together if they have the same 2
+        return [(mask, sum(1 << i for i in range(9) if unit[i] == mask))
+                for mask in set(unit) if POPCOUNT[mask] == 2 and unit.count(mask) == 2]
+
+    # squares that can be part of a subset, as (position bit, mask)
+    members = [(1 << i, mask) for i, mask in enumerate(unit) if 1 < POPCOUNT[mask] <= size]
+    found = []
+
+    def extend(start, union, chosen, left):
+        for k in range(start, len(members) - left + 1):
+            bit, mask = members[k]
+            new_union = union | mask
+            if POPCOUNT[new_union] > size:
+                continue
+            if left == 1:
+                found.append((new_union, chosen | bit))
+            else:
+                extend(k + 1, new_union, chosen | bit, left - 1)
+
+    if len(members) >= size:
+        extend(0, 0, 0, size)
+    return found
+
+
 def find_occurrences(squares):
     """returns
     list of 9
@@ -401,17 +852,145 @@ def find_occurrences(squares):
     """
     # this list tracks the indexes in the group that an occurrence appeared
     indexes = [[] for x in range(9)]
-    # goes through every square
-    for square in squares:
-        # checks if the square can have each number from 1-9
-        for i in range(9):
-            
-            if square.candidates[i]:
-                # adds an occurrence to the tracker and marks the index
-                indexes[i].append(squares.index(square))
+    # goes through every square and marks its index for each of its candidates
+    for index in range(len(squares)):
+        for i in MASK_INDEXES[squares[index].mask]:
+            indexes[i].append(index)
                 
     return indexes
 
+class Brancher:
+    """Chooses where to branch when a grid cannot be solved any further by logic.
+
+    Every empty square is a pivot with one alternative per candidate, and
+    every number missing from a set is a pivot with one alternative per
+    square of the set that can hold it. The pivots with the fewest
+    alternatives are collected and tie_breaker picks one of them:
+
+        "first"     the first one found (squares first, in index order)
+        "degree"    the one whose alternatives remove the most candidates
+                    from other squares
+        "digit"     the one whose number has the fewest candidates left in
+                    the grid
+        "random"    a random one, from random.Random(seed)
+
+    tie_breaker can also be a function (grid, pivots, brancher) -> pivot.
+    stats counts how many square and set pivots were chosen, and how many
+    times each tie breaker had to choose between several pivots.
+    """
+    def __init__(self, tie_breaker="degree", seed=None):
+        if callable(tie_breaker):
+            self.tie_breaker = tie_breaker
+            self.name = getattr(tie_breaker, "__name__", "custom")
+        else:
+            self.tie_breaker = TIE_BREAKERS[tie_breaker]
+            self.name = tie_breaker
+
+        self.random = random.Random(seed)
+        self.stats = Counter()
+
+    def pivots(self, grid):
+        """returns (size, pivots) where pivots is a list of the pivots with the
+            fewest alternatives, each either ("square", index) or
+            ("set", 9 * unit + number - 1)"""
+        numbers, masks, counts, positions = grid.numbers, grid.masks, grid.counts, grid.positions
+        best = 10
+        pivots = []
+
+        for i in range(81):
+            if numbers[i] == 0:
+                size = POPCOUNT[masks[i]]
+                if size < best:
+                    best = size
+                    pivots = [("square", i)]
+                elif size == best:
+                    pivots.append(("square", i))
+
+        for index in range(243):
+            if counts[index] == 0:
+                size = POPCOUNT[positions[index]]
+                if size < best:
+                    best = size
+                    pivots = [("set", index)]
+                elif size == best:
+                    pivots.append(("set", index))
+
+        return best, pivots
+
+    def choose(self, grid):
+        """returns the alternatives of the chosen pivot as a list of
+            (index, number), empty if the grid has no empty square left"""
+        size, pivots = self.pivots(grid)
+        if not pivots:
+            return []
+
+        if len(pivots) == 1:
+            pivot = pivots[0]
+        else:
+            pivot = self.tie_breaker(grid, pivots, self)
+            self.stats[self.name] += 1
+
+        self.stats[pivot[0]] += 1
+        return alternatives(grid, pivot)
+
+
+def alternatives(grid, pivot):
+    """returns the (index, number) placements a pivot can branch into"""
+    kind, key = pivot
+    if kind == "square":
+        return [(key, i + 1) for i in MASK_INDEXES[grid.masks[key]]]
+
+    cells = UNIT_CELLS[key // 9]
+    return [(cells[i], key % 9 + 1) for i in MASK_INDEXES[grid.positions[key]]]
+
+
+def first_pivot(grid, pivots, brancher):
+    return pivots[0]
+
+
+def degree_pivot(grid, pivots, brancher):
+    def peers_with(index, i):
+        # peers of square index that can hold number i + 1, counted from the
+        # position masks of its row, column and the rest of its quadrant
+        (row, row_bit), (col, col_bit), (quad, quad_bit) = CELL_SLOTS[index]
+        return POPCOUNT[positions[row + i] & ~row_bit] + POPCOUNT[positions[col + i] & ~col_bit] + \
+            POPCOUNT[positions[quad + i] & QUAD_OTHERS[index]]
+
+    def eliminations(pivot):
+        kind, key = pivot
+        if kind == "square":
+            return sum(peers_with(key, i) for i in MASK_INDEXES[masks[key]])
+        cells = UNIT_CELLS[key // 9]
+        return sum(peers_with(cells[pos], key % 9) for pos in MASK_INDEXES[positions[key]])
+
+    masks = grid.masks
+    positions = grid.positions
+    return max(pivots, key=eliminations)
+
+
+def digit_pivot(grid, pivots, brancher):
+    # how many squares of the grid still have each number as a candidate
+    remaining = [0] * 9
+    for unit in range(9):
+        for i in range(9):
+            remaining[i] += POPCOUNT[grid.positions[9 * unit + i]]
+
+    def fewest(pivot):
+        return min(remaining[number - 1] for index, number in alternatives(grid, pivot))
+
+    return min(pivots, key=fewest)
+
+
+def random_pivot(grid, pivots, brancher):
+    return brancher.random.choice(pivots)
+
+
+TIE_BREAKERS = {"first": first_pivot, "degree": degree_pivot,
+                "digit": digit_pivot, "random": random_pivot}
+
+# brancher used by Grid.brute_force when none is given
+DEFAULT_BRANCHER = Brancher()
+
 #######################################################################################
 #######################################################################################
 
@@ -0,0 +1,97 @@
+"""
+Puzzles and grid builders shared by the tests. Run the tests from v2 with:
+
+    python -m pytest -q
+
+Solution counts are checked against dlx, the exact cover search, which
+shares nothing with the Grid based engines.
+"""
+import random
+
+import pytest
+
+import canon
+import classes2 as classes
+import read
+
+# counts are compared up to this many solutions
+LIMIT = 20
+
+HARD = ["800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+        "000000010400000000020000000000050407008000300001090000300400200050100000000806000",
+        "100007090030020008009600500005300900010080002600004000300000010040000007007000300",
+        "000000039000001005003050800008090006070002000100400000009080050020000600400700000",
+        "052400000000070100000000000000802000300000600090500000106030000000000089700000000"]
+
+# a solution every other grid is made from by random_transform(), so the
+# tests do not depend on the generator
+SOLUTION = "534678912672195348198342567859761423426853791713924856961537284287419635345286179"
+
+
+def from_text(text):
+    """returns an 81 character puzzle as a 9x9 list"""
+    return read.to_grid(text.encode().translate(read.CELLS))
+
+
+def random_transform(rng):
+    """returns a random canon.Transform"""
+    rows = [3 * band + row for band in rng.sample(range(3), 3) for row in rng.sample(range(3), 3)]
+    cols = [3 * stack + col for stack in rng.sample(range(3), 3) for col in rng.sample(range(3), 3)]
+    return canon.Transform(rng.random() < 0.5, rows, cols, [0] + rng.sample(range(1, 10), 9))
+
+
+def random_solution(rng):
+    """returns a random transform of SOLUTION"""
+    return random_transform(rng).apply(from_text(SOLUTION))
+
+
+def partial_grid(solution, rng, share):
+    """returns solution with each square kept with probability share"""
+    return [[number if rng.random() < share else 0 for number in row] for row in solution]
+
+
+def random_grid(rng, clues):
+    """returns a grid of clues random numbers that do not share a set with the
+        same number, which usually has no solution or many"""
+    grid = [[0] * 9 for i in range(9)]
+    for index in rng.sample(range(81), clues):
+        row, col = divmod(index, 9)
+        number = rng.randint(1, 9)
+        if number not in (grid[peer // 9][peer % 9] for peer in classes.PEERS[index]):
+            grid[row][col] = number
+    return grid
+
+
+def conflicting_grid(solution, rng):
+    """returns a partial solution with one number repeated in a row"""
+    grid = partial_grid(solution, rng, 0.3)
+    row = rng.randrange(9)
+    first, second = rng.sample(range(9), 2)
+    grid[row][first] = grid[row][second] = solution[row][first]
+    return grid
+
+
+def is_solution(grid, puzzle):
+    """returns True if grid is a solved grid that keeps the numbers of puzzle"""
+    sets = [set(row) for row in grid] + [set(col) for col in zip(*grid)] + \
+        [{grid[3 * (quad // 3) + i // 3][3 * (quad % 3) + i % 3] for i in range(9)} for quad in range(9)]
+    return all(numbers == set(range(1, 10)) for numbers in sets) and \
+        all(given in (0, number) for row, solved in zip(puzzle, grid) for given, number in zip(row, solved))
+
+
+@pytest.fixture(scope="session")
+def hard():
+    return [from_text(text) for text in HARD]
+
+
+@pytest.fixture(scope="session")
+def grids():
+    """grids with no, one and many solutions, and grids with conflicts"""
+    rng = random.Random(7)
+    grids = [from_text(text) for text in HARD]
+    for i in range(10):
+        solution = random_solution(rng)
+        grids += [partial_grid(solution, rng, share) for share in (0.25, 0.35, 0.5, 0.7)]
+        grids.append(random_grid(rng, 20))
+        grids.append(conflicting_grid(solution, rng))
+    return grids
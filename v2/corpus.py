@@ -0,0 +1,176 @@
+"""
+Binary puzzle corpus, read through mmap so any range of puzzles can be
+used without parsing text or loading the file.
+
+    python -m corpus puzzles.txt [more.txt ...] -o puzzles.sdc [--no-index]
+
+A corpus file is a HEADER_SIZE byte header, COUNT records of
+RECORD_SIZE bytes and an optional index:
+
+    header      HEADER struct: MAGIC, VERSION, flags (HAS_INDEX), number
+                of puzzles and number of index entries, zero padded
+    records     the 81 numbers of a puzzle (0 for empty squares) packed two
+                to a byte, high nibble first, so the last byte only uses
+                its high nibble
+    index       one little endian uint64 per converted text file: the first
+                record that came from it
+
+Requires numpy.
+"""
+import argparse
+import mmap
+import struct
+
+import numpy as np
+
+import read
+
+MAGIC = b"SDKC"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+HEADER_SIZE = 32
+RECORD_SIZE = 41
+# header flags
+HAS_INDEX = 1
+
+# puzzles packed and written at a time by convert()
+CHUNK_SIZE = 1 << 16
+
+
+def pack(cells):
+    """returns an (N, 81) array of numbers as an (N, RECORD_SIZE) uint8 array of records"""
+    padded = np.zeros((len(cells), 2 * RECORD_SIZE), dtype=np.uint8)
+    padded[:, :81] = cells
+    return padded[:, 0::2] << 4 | padded[:, 1::2]
+
+
+def unpack(records):
+    """returns an (N, RECORD_SIZE) array of records as an (N, 81) uint8 array of numbers"""
+    cells = np.empty((len(records), 2 * RECORD_SIZE), dtype=np.uint8)
+    cells[:, 0::2] = records >> 4
+    cells[:, 1::2] = records & 15
+    return cells[:, :81]
+
+
+def is_corpus(path):
+    """returns True if the file at path starts with MAGIC"""
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class Corpus:
+    """Read only view of a corpus file.
+
+    Indexing with an int returns the (81,) numbers of that puzzle, and with
+    a slice the (N, 81) numbers of the puzzles in it. Only those records
+    are read from the file.
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    path            str             file the corpus was opened from
+
+    records         ndarray         (N, RECORD_SIZE) uint8 view of the
+                                    packed records in the mapped file
+
+    sections        ndarray or None first record of every converted text
+                                    file, None if the corpus has no index
+
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, count, entries = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC or version != VERSION:
+            self.mmap.close()
+            raise ValueError("{0} is not a version {1} corpus file".format(path, VERSION))
+
+        self.records = np.frombuffer(self.mmap, dtype=np.uint8, count=count * RECORD_SIZE,
+                                     offset=HEADER_SIZE).reshape(count, RECORD_SIZE)
+        self.sections = None
+        if flags & HAS_INDEX:
+            self.sections = np.frombuffer(self.mmap, dtype="<u8", count=entries,
+                                          offset=HEADER_SIZE + count * RECORD_SIZE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return unpack(self.records[key])
+        return unpack(self.records[key:key + 1 or None])[0]
+
+    def section(self, i):
+        """returns the (start, stop) records that came from text file i"""
+        start = int(self.sections[i])
+        stop = int(self.sections[i + 1]) if i + 1 < len(self.sections) else len(self)
+        return start, stop
+
+    def close(self):
+        """unmaps the file, every array taken from records must be gone by then"""
+        self.records = self.sections = None
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def convert(paths, corpus_path, index=True):
+    """Writes the puzzles of every text file in paths (any format
+        read.InputReader accepts) to a corpus file, one section per text
+        file. Returns the number of puzzles written"""
+    reader = read.InputReader()
+    count = 0
+    sections = []
+
+    def flush(buffer):
+        cells = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, 81)
+        corpus.write(pack(cells).tobytes())
+        return len(cells)
+
+    with open(corpus_path, "wb") as corpus:
+        corpus.write(bytes(HEADER_SIZE))
+
+        for path in paths:
+            sections.append(count)
+            buffer = bytearray()
+
+            for record in reader.from_file(path, flat=True):
+                buffer += record
+                if len(buffer) == 81 * CHUNK_SIZE:
+                    count += flush(buffer)
+                    buffer = bytearray()
+
+            count += flush(buffer)
+
+        flags = 0
+        if index:
+            flags |= HAS_INDEX
+            corpus.write(np.array(sections, dtype="<u8").tobytes())
+
+        corpus.seek(0)
+        corpus.write(HEADER.pack(MAGIC, VERSION, flags, count, len(sections) if index else 0))
+
+    return count
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m corpus",
+                                     description="Convert text puzzle files to a binary corpus.")
+    parser.add_argument("paths", nargs="+", help="text files of puzzles")
+    parser.add_argument("-o", "--output", required=True, help="corpus file to write")
+    parser.add_argument("--no-index", action="store_true", help="leave out the index of the text files")
+    args = parser.parse_args(args)
+
+    count = convert(args.paths, args.output, not args.no_index)
+    print("{0} puzzles written to {1}".format(count, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Knuth's Algorithm X with dancing links over the Sudoku exact-cover matrix.
+
+The matrix has 729 rows, one for each (row, col, number) placement, and
+324 columns, one for each constraint a solved grid satisfies:
+
+    columns   0 - 80     square 9 * row + col holds a number
+    columns  81 - 161    row r holds number n
+    columns 162 - 242    column c holds number n
+    columns 243 - 323    quadrant q holds number n
+
+Every placement covers exactly one column of each group, so a solution is
+a set of 81 placements that covers every column exactly once.
+
+The links are kept in flat lists instead of node objects. Node 0 is the
+root, nodes 1 - 324 are the column headers and the 4 nodes of placement p
+are 325 + 4 * p to 328 + 4 * p.
+"""
+from time import perf_counter
+
+ROOT = 0
+COLUMNS = 324
+PLACEMENTS = 729
+FIRST_NODE = COLUMNS + 1
+
+# links of the untouched matrix, built on first use and copied for every puzzle
+_template = None
+
+
+def placement_columns(placement):
+    """returns the 4 column headers covered by placement (9 * square + number - 1)"""
+    square, i = divmod(placement, 9)
+    row, col = divmod(square, 9)
+    quad = col // 3 + 3 * (row // 3)
+    return (1 + square, 82 + 9 * row + i, 163 + 9 * col + i, 244 + 9 * quad + i)
+
+
+def _build_template():
+    size = FIRST_NODE + 4 * PLACEMENTS
+    left = [0] * size
+    right = [0] * size
+    up = list(range(size))
+    down = list(range(size))
+    column = list(range(size))
+    sizes = [0] * FIRST_NODE
+
+    for header in range(FIRST_NODE):
+        left[header] = header - 1 if header else COLUMNS
+        right[header] = header + 1 if header != COLUMNS else ROOT
+
+    for placement in range(PLACEMENTS):
+        first = FIRST_NODE + 4 * placement
+
+        for offset, header in enumerate(placement_columns(placement)):
+            node = first + offset
+            # append the node to the bottom of its column
+            column[node] = header
+            up[node] = up[header]
+            down[node] = header
+            down[up[header]] = node
+            up[header] = node
+            sizes[header] += 1
+            # and link it into the ring of its placement
+            left[node] = first + (offset - 1) % 4
+            right[node] = first + (offset + 1) % 4
+
+    return left, right, up, down, column, sizes
+
+
+class DancingLinks:
+    """Exact-cover matrix for one puzzle with its givens already selected.
+
+    grid is a list of lists of int with dimensions 9x9, as returned by
+    Grid.copy_grid(), with 0 for empty squares
+    """
+    def __init__(self, grid):
+        global _template
+        if _template is None:
+            _template = _build_template()
+
+        self.left, self.right, self.up, self.down, self.column, self.sizes = \
+            [list(links) for links in _template]
+        self.givens = []
+        # False if two givens cover the same constraint
+        self.consistent = True
+        # number of branch points of the last search, and whether it ran out of time
+        self.nodes = 0
+        self.timed_out = False
+        covered = [False] * FIRST_NODE
+
+        for row in range(9):
+            for col in range(9):
+                number = grid[row][col]
+                if number == 0:
+                    continue
+                if type(number) is not int or not 1 <= number <= 9:
+                    raise ValueError("expected numbers from 0 to 9, got {0!r}".format(number))
+
+                placement = 9 * (9 * row + col) + number - 1
+                self.givens.append(placement)
+
+                for header in placement_columns(placement):
+                    if covered[header]:
+                        self.consistent = False
+                        return
+                    covered[header] = True
+                    self.cover(header)
+
+    def cover(self, header):
+        """Removes a column and every placement that covers it from the matrix"""
+        left, right, up, down, column, sizes = \
+            self.left, self.right, self.up, self.down, self.column, self.sizes
+
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                up[down[j]] = up[j]
+                down[up[j]] = down[j]
+                sizes[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, header):
+        """Undoes cover(header), in exactly the reverse order"""
+        left, right, up, down, column, sizes = \
+            self.left, self.right, self.up, self.down, self.column, self.sizes
+
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                sizes[column[j]] += 1
+                up[down[j]] = j
+                down[up[j]] = j
+                j = left[j]
+            i = up[i]
+
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def search(self, limit=None, store=True, deadline=None):
+        """Finds up to limit solutions (every solution if limit is None).
+
+        Returns (count, solutions) where solutions is a list of 9x9 grids, left
+        empty when store is False so counting does not build any grids. If
+        time.perf_counter() passes deadline the search stops early and
+        timed_out is set
+        """
+        solutions = []
+        self.nodes = 0
+        self.timed_out = False
+        if not self.consistent or limit == 0:
+            return 0, solutions
+
+        chosen = []
+        count = self._search(chosen, solutions, limit, store, deadline, 0)
+        return count, solutions
+
+    def _search(self, chosen, solutions, limit, store, deadline, count):
+        right, down, column, sizes = self.right, self.down, self.column, self.sizes
+
+        if right[ROOT] == ROOT:
+            if store:
+                solutions.append(self.to_grid(chosen))
+            return count + 1
+
+        self.nodes += 1
+        if deadline is not None and perf_counter() > deadline:
+            self.timed_out = True
+            return count
+
+        # choose the column with the fewest placements left
+        header = right[ROOT]
+        best = sizes[header]
+        i = right[header]
+        while i != ROOT and best > 1:
+            if sizes[i] < best:
+                header = i
+                best = sizes[i]
+            i = right[i]
+
+        if best == 0:
+            return count
+
+        self.cover(header)
+
+        node = down[header]
+        while node != header:
+            chosen.append((node - FIRST_NODE) // 4)
+
+            j = right[node]
+            while j != node:
+                self.cover(column[j])
+                j = right[j]
+
+            count = self._search(chosen, solutions, limit, store, deadline, count)
+
+            j = self.left[node]
+            while j != node:
+                self.uncover(column[j])
+                j = self.left[j]
+
+            chosen.pop()
+
+            if self.timed_out or limit is not None and count >= limit:
+                break
+            node = down[node]
+
+        self.uncover(header)
+        return count
+
+    def to_grid(self, chosen):
+        """returns the 9x9 grid made by the givens and the chosen placements"""
+        grid = [[0] * 9 for i in range(9)]
+        for placement in self.givens + chosen:
+            square, i = divmod(placement, 9)
+            grid[square // 9][square % 9] = i + 1
+        return grid
+
+
+def first_solution(grid):
+    """returns the first solution of grid as a 9x9 list, or None if it has none"""
+    count, solutions = DancingLinks(grid).search(limit=1)
+    return solutions[0] if count else None
+
+
+def count_solutions(grid, limit=None):
+    """returns the number of solutions of grid, stopping as soon as limit
+        solutions have been found"""
+    return DancingLinks(grid).search(limit=limit, store=False)[0]
+
+
+def all_solutions(grid, limit=None):
+    """returns a list of every solution of grid (at most limit of them)"""
+    return DancingLinks(grid).search(limit=limit)[1]
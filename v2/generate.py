@@ -0,0 +1,234 @@
+"""
+Headless generator of puzzles with exactly one solution.
+
+    python -m generate [-n COUNT] [-j WORKERS] [--clues CLUES]
+                       [--symmetry SYMMETRY] [--band BAND] [--seed SEED]
+                       [--solutions] [-o puzzles.txt] [--format FORMAT]
+
+A puzzle starts as a random solution: the 3 quadrants on the diagonal,
+which do not share any set, are filled with random permutations and the
+trail engine fills in the rest with a random brancher. Clues are then
+removed from one classes.Grid in random order (one square, or a group of
+squares matching the symmetry, at a time). After every removal the grid
+is searched in place for a solution that differs from the original in a
+removed square, and the clues go back if there is one, so the puzzle
+always has a unique solution and nothing is rebuilt between checks.
+
+The batch mode spreads the puzzles over several processes and drops any
+puzzle equivalent to one already made (see canon.fingerprint).
+"""
+import argparse
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import canon
+import classes2 as classes
+import rate
+import read
+import search
+
+# cells that are removed together, for each symmetry: square i with its
+# mirror images
+SYMMETRIES = {
+    "none": lambda i: (i,),
+    "rotational": lambda i: (i, 80 - i),
+    "mirror": lambda i: (i, 9 * (i // 9) + 8 - i % 9),
+    "diagonal": lambda i: (i, 9 * (i % 9) + i // 9),
+}
+
+# difficulty bands, from the least to the most needed to solve a puzzle
+BANDS = tuple(band for band, limit in rate.BAND_LIMITS)
+
+# random solutions tried by generate() before giving up on the clues and band asked for
+ATTEMPTS = 100
+# puzzles made by each batch task
+CHUNK_SIZE = 16
+
+# brancher of the uniqueness searches, which only need to find any solution
+# and are quicker without the degree tie breaker
+PROBE_BRANCHER = classes.Brancher("first")
+
+EMPTY_GRID = [[0] * 9 for i in range(9)]
+DIAGONAL_QUADRANTS = (18, 22, 26)
+
+
+def random_solution(rng):
+    """returns a random solved grid as a 9x9 list, rng is a random.Random"""
+    grid = classes.Grid(EMPTY_GRID)
+    for quad in DIAGONAL_QUADRANTS:
+        for index, number in zip(classes.UNIT_CELLS[quad], rng.sample(range(1, 10), 9)):
+            grid.place(index, number)
+
+    return search.first_solution(grid, classes.Brancher("random", seed=rng.random()))
+
+
+def is_unique(grid, cells, numbers):
+    """returns True if grid, a unique puzzle with the squares cells (which held
+        numbers) emptied, still has no other solution. Any other solution
+        has a different number in one of cells, so for each j the grid is
+        searched with cells[j] not holding numbers[j] and the cells before
+        it holding theirs"""
+    masks, positions = grid.masks, grid.positions
+    # squares that are a naked or hidden single of the clues left can only
+    # hold their old number, which is most of them until the puzzle gets sparse
+    if all(classes.POPCOUNT[masks[index]] == 1 or
+           any(positions[base + number - 1] == bit for base, bit in classes.CELL_SLOTS[index])
+           for index, number in zip(cells, numbers)):
+        return True
+
+    recording = grid.trail is not None
+
+    for j, index in enumerate(cells):
+        checkpoint = grid.checkpoint()
+        possible = all(grid.place(cell, number) for cell, number in zip(cells[:j], numbers[:j])) and \
+            grid.eliminate(index, classes.NUMBER_BITS[numbers[j]])
+        found = possible and search.count_solutions(grid, limit=1, brancher=PROBE_BRANCHER) > 0
+        grid.undo(checkpoint)
+
+        if found:
+            break
+    else:
+        found = False
+
+    if not recording:
+        grid.trail = None
+    return not found
+
+
+def remove_clues(solution, rng, clues=0, symmetry="none"):
+    """Removes clues from solution in random order for as long as the puzzle
+        keeps a unique solution, stopping once it has at most clues clues.
+        Returns the puzzle as a 9x9 list"""
+    grid = classes.Grid(solution)
+    group = SYMMETRIES[symmetry]
+    groups = list({tuple(sorted(set(group(i)))) for i in range(81)})
+    groups.sort()
+    rng.shuffle(groups)
+    remaining = 81
+
+    for cells in groups:
+        if remaining <= clues:
+            break
+
+        numbers = [grid.numbers[index] for index in cells]
+        for index in cells:
+            grid.unplace(index)
+
+        if is_unique(grid, cells, numbers):
+            remaining -= len(cells)
+        else:
+            for index, number in zip(cells, numbers):
+                grid.place(index, number)
+
+    return grid.copy_grid()
+
+
+def clue_count(puzzle):
+    return sum(1 for row in puzzle for number in row if number)
+
+
+def generate(clues=None, symmetry="none", band=None, rng=None, attempts=ATTEMPTS):
+    """Returns (puzzle, solution) as 9x9 lists, where puzzle has a unique
+    solution, at most clues clues (as few as the removal order allows if
+    None) and is in the difficulty band of rate.rate(), one of BANDS (any
+    band if None).
+    rng is a random.Random. None is returned if no puzzle matched after
+    attempts random solutions.
+    """
+    if symmetry not in SYMMETRIES:
+        raise ValueError("unknown symmetry {0!r}, expected one of {1}".format(symmetry, tuple(SYMMETRIES)))
+    if band is not None and band not in BANDS:
+        raise ValueError("unknown band {0!r}, expected one of {1}".format(band, BANDS))
+
+    rng = rng or random.Random()
+
+    for attempt in range(attempts):
+        solution = random_solution(rng)
+        puzzle = remove_clues(solution, rng, clues or 0, symmetry)
+
+        if clues is not None and clue_count(puzzle) > clues:
+            continue
+        if band is not None and rate.rate(puzzle, solution).band != band:
+            continue
+        return puzzle, solution
+
+    return None
+
+
+def _generate_chunk(size, seed, options):
+    """makes size puzzles with random.Random(seed), for a batch worker"""
+    rng = random.Random(seed)
+    return [puzzle for puzzle in (generate(rng=rng, **options) for i in range(size)) if puzzle]
+
+
+def generate_batch(count, workers=None, seed=None, **options):
+    """Yields count (puzzle, solution) pairs made across workers processes
+    (every core if None), skipping puzzles equivalent to one already
+    yielded. options are passed to generate(), and the same seed gives the
+    same puzzles for the same count.
+    """
+    workers = workers or os.cpu_count() or 1
+    if seed is None:
+        seed = random.SystemRandom().randrange(1 << 63)
+
+    seen = set()
+    made = 0
+    task = 0
+
+    with ProcessPoolExecutor(workers) as executor:
+        while made < count:
+            # enough tasks to cover what is left, small enough to keep every worker busy
+            left = count - made
+            size = min(CHUNK_SIZE, -(-left // workers))
+            tasks = -(-left // size)
+            futures = [executor.submit(_generate_chunk, size, "{0}-{1}-{2}".format(seed, size, task + i), options)
+                       for i in range(tasks)]
+            task += tasks
+            made_before = made
+
+            for future in futures:
+                for puzzle, solution in future.result():
+                    key = canon.fingerprint(puzzle, 128)
+                    if made < count and key not in seen:
+                        seen.add(key)
+                        made += 1
+                        yield puzzle, solution
+
+            if made == made_before:
+                raise RuntimeError("no puzzle matched {0}".format(options))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m generate",
+                                     description="Generate puzzles with a unique solution.")
+    parser.add_argument("-n", "--count", type=int, default=1, help="puzzles to make (default: 1)")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes (default: every core)")
+    parser.add_argument("--clues", type=int, help="most clues a puzzle may have")
+    parser.add_argument("--symmetry", default="none", choices=tuple(SYMMETRIES),
+                        help="squares removed together (default: none)")
+    parser.add_argument("--band", choices=BANDS, help="difficulty band of the puzzles")
+    parser.add_argument("--seed", type=int, help="seed for reproducible puzzles")
+    parser.add_argument("--solutions", action="store_true", help="write each solution after its puzzle")
+    parser.add_argument("-o", "--output", help="file for the puzzles (stdout if not given)")
+    parser.add_argument("--format", default="line", choices=read.FORMATS, help="output format (default: line)")
+    args = parser.parse_args(args)
+
+    began = perf_counter()
+    options = {"clues": args.clues, "symmetry": args.symmetry, "band": args.band}
+
+    with read.OutputWriter(args.output or sys.stdout, args.format) as writer:
+        for puzzle, solution in generate_batch(args.count, args.workers, args.seed, **options):
+            if args.solutions:
+                writer.write(puzzle, solution)
+            else:
+                writer.write(puzzle)
+
+    print("{0} puzzles, {1:.1f} puzzles/sec".format(args.count, args.count / (perf_counter() - began)),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
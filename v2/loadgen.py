@@ -0,0 +1,106 @@
+"""
+Load generator for the solving service (see service.py).
+
+    python -m loadgen puzzles.txt [--host HOST] [--port PORT]
+                      [-c CONCURRENCY] [-n REQUESTS] [--timeout SECONDS]
+
+Opens CONCURRENCY keep-alive connections that send the puzzles of the
+file (going round it as often as needed) one request at a time, until
+REQUESTS requests have been answered, then reports the latency
+percentiles, the throughput and the number of answers of each status.
+Uses only the standard library.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from collections import Counter
+from time import perf_counter
+
+import read
+import service
+
+
+def percentile(values, p):
+    """returns the p-th percentile (0-100) of sorted values, by nearest rank"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+
+async def post(reader, writer, host, body):
+    """sends one solve request on a connection, returns (status code, JSON answer)"""
+    writer.write("POST /solve HTTP/1.1\r\nHost: {0}\r\nContent-Type: application/json\r\n"
+                 "Content-Length: {1}\r\n\r\n".format(host, len(body)).encode("latin-1") + body)
+    await writer.drain()
+
+    code = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return code, json.loads(await reader.readexactly(length))
+
+
+async def run(puzzles, host=service.HOST, port=service.PORT, concurrency=16, count=1000, timeout=None):
+    """Sends count requests for puzzles (81 character strings) over concurrency
+    connections. Returns (sorted latencies in seconds, Counter of statuses,
+    seconds taken), where a status is the answer's status or the HTTP
+    status code if it was not 200.
+    """
+    latencies = []
+    statuses = Counter()
+    sent = 0
+
+    async def connection():
+        nonlocal sent
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while sent < count:
+                puzzle = puzzles[sent % len(puzzles)]
+                sent += 1
+                body = json.dumps({"puzzle": puzzle, "timeout": timeout}).encode()
+
+                began = perf_counter()
+                code, answer = await post(reader, writer, host, body)
+                latencies.append(perf_counter() - began)
+                statuses[answer["status"] if code == 200 else code] += 1
+        finally:
+            writer.close()
+
+    began = perf_counter()
+    await asyncio.gather(*(connection() for i in range(concurrency)))
+    return sorted(latencies), statuses, perf_counter() - began
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m loadgen", description="Load test the solving service.")
+    parser.add_argument("path", help="file of puzzles to send (any format read.InputReader accepts)")
+    parser.add_argument("--host", default=service.HOST, help="service address (default: {0})".format(service.HOST))
+    parser.add_argument("--port", type=int, default=service.PORT,
+                        help="service port (default: {0})".format(service.PORT))
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="connections (default: 16)")
+    parser.add_argument("-n", "--requests", type=int, default=1000, help="requests to send (default: 1000)")
+    parser.add_argument("--timeout", type=float, help="seconds each request may take on the service")
+    args = parser.parse_args(args)
+
+    puzzles = [read.to_text(record) for record in read.InputReader().from_file(args.path, flat=True)]
+    if not puzzles:
+        parser.error("no puzzles in {0}".format(args.path))
+
+    latencies, statuses, elapsed = asyncio.run(
+        run(puzzles, args.host, args.port, args.concurrency, args.requests, args.timeout))
+
+    print("{0} requests in {1:.2f} s, {2:.1f} requests/sec".format(len(latencies), elapsed,
+                                                                   len(latencies) / elapsed))
+    print("latency p50 {0:.1f} ms, p99 {1:.1f} ms, max {2:.1f} ms".format(
+        1000 * percentile(latencies, 50), 1000 * percentile(latencies, 99), 1000 * percentile(latencies, 100)))
+    print(", ".join("{0} {1}".format(count, status) for status, count in statuses.most_common()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
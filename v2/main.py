@@ -1,6 +1,10 @@
 import pygame
 import random
+import threading
+from concurrent.futures import Future
 import classes2 as classes
+import generate
+import solver
 import ui
 pygame.init()
 
@@ -44,63 +48,33 @@ CLOCK = pygame.time.Clock()
 # Global bool constant for whether the user wants the program to run
 RUN = True
 
-EVERY_CORD = []
-for x in range(9):
-    for y in range(9):
-        EVERY_CORD.append((x, y))
 
-
-def solve(grid):
+def solve(grid, engine="trail"):
     """
     Takes a Grid object as a parameter and if it's solvable returns the solved
     Grid object. If it's not solvable, it returns False.
+
+    The solving itself is done by the headless solver module, engine is
+    one of solver.ENGINES.
     """
     # determine if the given grid is solvable or not
     if not grid.check_correct():
         return False        # return False if the grid cannot be solved
 
-    # if the grid can be solved, initialize variables needed to begin solving
-    global RUN
-    grids = [grid]
-    solved = False
-    solved_grid = None
-    
-    timer = classes.Timer()
-    
-    # run the function until either the user wants to exit or the grid is solved
-    while not solved and RUN:
-        # No refresh cycle limitation
-        # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                RUN = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    RUN = False
-                    
-        if len(grids) == 0:
-            return False
-        # solving algorithm
-        current_grid = grids[-1]            # choose the last grid in the list of grids
-        result = current_grid.solve()       # do a single step in the solving process
-
-        if not current_grid.solvable:       # if the grid is no longer solvable, delete it
-            grids.pop(-1)
-        elif current_grid.is_solved():      # if the grid has been solved
-            solved = True                           # exit the loop
-            solved_grid = current_grid              # and return the solution
-        elif result:                        # if the return value is a grid (brute force returns grid)
-            grids.remove(current_grid)          # remove the current grid from the list
-            grids.extend(result)               # replace it with the different possibilities
-
-        # refresh the screen and board (much slower)
-        draw_board(SCREEN, None, [-1, -1])
-        current_grid.draw(SCREEN, is_solve=True)
-        pygame.display.flip()
-        
-    timer.stop()
-    # return the solved grid if it is solved
-    return solved_grid
+    # look for a second solution as well, to tell whether the grid has only one
+    result = solver.solve(grid.copy_grid(), engine=engine, max_solutions=2)
+    if result.solution is None:
+        print("No solution, found by {0} in {1:.6f} seconds".format(result.engine, result.elapsed))
+        return False
+
+    print("Solved with {0} in {1:.6f} seconds, {2}".format(
+        result.engine, result.elapsed, "unique solution" if result.count == 1 else "several solutions"))
+    solved = classes.Grid(result.solution, show_candidates=False)
+    # keep the given squares locked, so they are still drawn as givens
+    for index in range(81):
+        if grid.flags[index] & classes.LOCKED:
+            solved.set_flag(index, classes.LOCKED, True)
+    return solved
 
 
 def main():
@@ -130,6 +104,9 @@ def main():
     # list of buttons
     buttons = [solve_button, check_button, clear_button, show_button, load_random, hardest_button]
 
+    # Future of the grid being generated, None when no grid is being generated
+    generating = None
+
     global RUN
 
     while RUN:
@@ -187,10 +164,19 @@ def main():
                     elif y in range(250, 300):
                         grid.clear()
                     elif y in range(325, 375):
-                        grid = generate_grid()
+                        if generating is None:
+                            generating = run_in_background(generate_grid)
+                            load_random.show("Generating...")
                     elif y in range(400, 450):
                         grid = classes.Grid(HARDEST_GRID, show_candidates=False)
 
+        # show the generated grid once it is ready
+        if generating is not None and generating.done():
+            grid = generating.result()
+            generating = None
+            load_random.reset()
+            solve_button.reset()
+
         # refresh the screen, board, and buttons
         draw_board(SCREEN, selected_square, selected_cord)
         grid.draw(SCREEN, is_solve=False)
@@ -201,32 +187,34 @@ def main():
 
 
 def generate_grid():
-    """This function generates a random grid of a random difficulty and returns
-        it as a Grid object. It creates an empty grid, fills a random square,
-        the solves it. Then it randomly removes"""
-    grid = classes.Grid([[0] * 9] * 9)
-    x, y = random.randrange(9), random.randrange(9)
-    grid.set_square((x, y), random.randrange(1, 10))
-    cords = EVERY_CORD.copy()
-
-    grid = solve(grid)
-    grid.show_candidates = False
-
-    squares_to_clear = []
-
-    for i in range(50 + random.randrange(0, 19)):
-        cord_index = random.randrange(len(cords))
-        cord = cords[cord_index]
-        cords.pop(cord_index)
-        squares_to_clear.append(cord)
-
-    for cord in squares_to_clear:
-        grid.set_square(cord, 0)
+    """This function generates a random grid with a unique solution, in a
+        random difficulty band, and returns it as a Grid object with its
+        numbers locked. If no puzzle of that band turns up, the grid is from
+        any band"""
+    # generate() only gives up when it is asked for a band
+    puzzle, solution = generate.generate(band=random.choice(generate.BANDS)) or generate.generate()
+    grid = classes.Grid(puzzle, show_candidates=False)
     grid.set_board()
 
     return grid
 
 
+def run_in_background(function):
+    """This function runs function on a daemon thread, so the event loop keeps
+        going (and the window can be closed) while it works, and returns a
+        Future of its result"""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(function())
+        except BaseException as error:
+            future.set_exception(error)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
 def draw_board(screen, selected_square, cord):
     """This function draws a 9 x 9 grid and the selected square indicator
         onto the passed surface"""
@@ -0,0 +1,310 @@
+"""
+Parallel search of a single puzzle across several processes.
+
+    python -m parallel PUZZLE [-j WORKERS] [--limit LIMIT] [--timeout SECONDS]
+
+The top of the search tree is split breadth first into about
+SPLIT_FACTOR open grids per worker, which go into a shared task queue.
+Each worker takes a grid, searches it like search.Search, and takes
+another once it is done. Whenever a worker waits for a task and the
+queue is empty, the next busy worker to reach a branch point gives away
+the untried alternatives of its shallowest branch point (the grid at
+that point, with the alternatives it has tried removed) as a new task,
+so the idle worker steals the biggest piece of work left.
+
+Solutions are sent to the parent as soon as they are found, and the
+first one that makes the count reach the limit sets a shared stop flag
+that every worker checks at every node, so the rest of the search is
+cancelled within a node. Only 9x9 grids are supported, like everywhere
+else.
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+from time import perf_counter
+
+import classes2 as classes
+import search
+import solver
+
+# open grids per worker the top of the tree is split into before the workers start
+SPLIT_FACTOR = 2
+# seconds the parent waits for a message before checking the timeout and the workers
+POLL_INTERVAL = 0.05
+
+# indexes of the shared counters
+STOP, FOUND, IDLE, QUEUED, PENDING = range(5)
+
+
+class StealingSearch(search.Search):
+    """search.Search of one task of a worker, that sends every solution to the
+    parent, stops once the shared STOP counter is set and gives away part of
+    its tree when a worker is idle.
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    counters        RawArray        counters shared by the workers, indexed
+                                    STOP, FOUND, IDLE, QUEUED and PENDING
+
+    lock            Lock            lock for updating counters
+
+    tasks           Queue           grids waiting for a worker
+
+    results         Queue           messages for the parent
+
+    levels          list            [checkpoint, square, number,
+                                    alternatives left, given away] of
+                                    every branch point being explored,
+                                    shallowest first
+
+    """
+    def __init__(self, grid, brancher, limit, counters, lock, tasks, results):
+        super().__init__(grid, brancher, limit=None)
+        self.max_solutions = limit
+        self.counters = counters
+        self.lock = lock
+        self.tasks = tasks
+        self.results = results
+        self.levels = []
+
+    def _search(self):
+        """returns True once the search should stop"""
+        grid = self.grid
+        counters = self.counters
+
+        if not search.propagate(grid):
+            return False
+
+        if grid.is_solved():
+            self.count += 1
+            self.results.put(("solution", grid.copy_grid()))
+            with self.lock:
+                counters[FOUND] += 1
+                if self.max_solutions is not None and counters[FOUND] >= self.max_solutions:
+                    counters[STOP] = 1
+            return bool(counters[STOP])
+
+        self.nodes += 1
+        if counters[STOP]:
+            return True
+        if counters[IDLE] > counters[QUEUED]:
+            self.give_away()
+
+        alternatives = self.brancher.choose(grid)
+        level = [0, 0, 0, 0, False]
+        self.levels.append(level)
+
+        try:
+            for k, (index, number) in enumerate(alternatives):
+                checkpoint = grid.checkpoint()
+                level[:4] = checkpoint, index, number, len(alternatives) - k - 1
+                grid.place(index, number)
+                stop = self._search()
+                grid.undo(checkpoint)
+
+                if stop:
+                    return True
+                # another worker has the alternatives left
+                if level[4]:
+                    return False
+
+                if not grid.eliminate(index, classes.NUMBER_BITS[number]):
+                    return False
+        finally:
+            self.levels.pop()
+
+        return False
+
+    def give_away(self):
+        """Puts the untried alternatives of the shallowest branch point that has
+            any into the task queue, if a worker still needs a task"""
+        for level in self.levels:
+            if level[3] and not level[4]:
+                break
+        else:
+            return
+
+        with self.lock:
+            if self.counters[IDLE] <= self.counters[QUEUED]:
+                return
+            self.counters[QUEUED] += 1
+            self.counters[PENDING] += 1
+
+        # the grid at that branch point, with the alternative being searched
+        # taken out as well
+        checkpoint, index, number = level[:3]
+        task = self.grid.copy()
+        task.trail = self.grid.trail[:]
+        task.undo(checkpoint)
+        task.trail = None
+        task.eliminate(index, classes.NUMBER_BITS[number])
+
+        level[4] = True
+        self.tasks.put(task)
+
+
+def _work(tasks, results, counters, lock, brancher, limit):
+    """worker process: searches grids from tasks until it gets None"""
+    # tasks given away after the search was cancelled are never read, and
+    # must not keep the process from exiting
+    tasks.cancel_join_thread()
+    while True:
+        with lock:
+            counters[IDLE] += 1
+        grid = tasks.get()
+        with lock:
+            counters[IDLE] -= 1
+            if grid is not None:
+                counters[QUEUED] -= 1
+        if grid is None:
+            break
+
+        nodes = 0
+        if not counters[STOP] and grid.solvable:
+            run = StealingSearch(grid, brancher, limit, counters, lock, tasks, results)
+            run.run(store=False)
+            nodes = run.nodes
+
+        results.put(("done", nodes))
+        with lock:
+            counters[PENDING] -= 1
+
+
+def split(grid, size, brancher=None, limit=None):
+    """Expands grid breadth first until there are at least size open grids or
+        none are left. Returns (open grids, solutions found, nodes)"""
+    brancher = brancher or classes.DEFAULT_BRANCHER
+    grids = [grid]
+    solutions = []
+    nodes = 0
+
+    while grids and len(grids) < size:
+        grid = grids.pop(0)
+        if not search.propagate(grid):
+            continue
+        if grid.is_solved():
+            solutions.append(grid.copy_grid())
+            if limit is not None and len(solutions) >= limit:
+                break
+            continue
+
+        nodes += 1
+        # the alternatives of a pivot never share a solution, so the new
+        # grids need nothing removed from one another
+        for index, number in brancher.choose(grid):
+            child = grid.copy()
+            if child.place(index, number):
+                grids.append(child)
+
+    return grids, solutions, nodes
+
+
+def solve(puzzle, *, workers=None, max_solutions=1, timeout=None, brancher=None):
+    """Solves puzzle across workers processes (every core if None) and returns
+    a solver.Result with the engine "parallel". max_solutions (None for no
+    limit) cancels the search once that many solutions have been found and
+    timeout is a number of seconds after which it gives up.
+    """
+    start = perf_counter()
+    deadline = None if timeout is None else start + timeout
+    workers = workers or os.cpu_count() or 1
+    brancher = brancher or classes.DEFAULT_BRANCHER
+
+    grid = classes.Grid(puzzle)
+    if solver.has_conflicts(grid):
+        return solver.Result(solver.UNSOLVABLE, [], 0, "parallel", 0, perf_counter() - start)
+
+    grids, solutions, nodes = split(grid, workers * SPLIT_FACTOR, brancher, max_solutions)
+    timed_out = False
+
+    if grids and (max_solutions is None or len(solutions) < max_solutions):
+        limit = None if max_solutions is None else max_solutions - len(solutions)
+        tasks = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        lock = multiprocessing.Lock()
+        counters = multiprocessing.RawArray("i", 5)
+        counters[QUEUED] = counters[PENDING] = len(grids)
+        for task in grids:
+            tasks.put(task)
+
+        processes = [multiprocessing.Process(target=_work, args=(tasks, results, counters, lock, brancher, limit),
+                                             daemon=True)
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+
+        def receive(message):
+            nonlocal nodes
+            kind, value = message
+            if kind == "solution":
+                if max_solutions is None or len(solutions) < max_solutions:
+                    solutions.append(value)
+            else:
+                nodes += value
+
+        try:
+            while counters[PENDING] and not counters[STOP]:
+                if deadline is not None and perf_counter() > deadline:
+                    timed_out = True
+                    break
+                try:
+                    receive(results.get(timeout=POLL_INTERVAL))
+                except queue.Empty:
+                    pass
+        finally:
+            # cancel whatever is still running and read every message sent
+            # before the workers finish
+            counters[STOP] = 1
+            for process in processes:
+                tasks.put(None)
+            while any(process.is_alive() for process in processes):
+                try:
+                    receive(results.get(timeout=POLL_INTERVAL))
+                except queue.Empty:
+                    pass
+            while True:
+                try:
+                    receive(results.get_nowait())
+                except queue.Empty:
+                    break
+            for process in processes:
+                process.join()
+            tasks.cancel_join_thread()
+
+    count = len(solutions)
+    if count:
+        status = solver.SOLVED
+    elif timed_out:
+        status = solver.TIMEOUT
+    else:
+        status = solver.UNSOLVABLE
+
+    return solver.Result(status, solutions, count, "parallel", nodes, perf_counter() - start, timed_out)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m parallel",
+                                     description="Solve one puzzle across several processes.")
+    parser.add_argument("puzzle", help="the puzzle as 81 characters, 0 or . for empty squares")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes (default: every core)")
+    parser.add_argument("--limit", type=int, default=2,
+                        help="solutions to stop at, 2 tells whether it is unique (default: 2)")
+    parser.add_argument("--timeout", type=float, help="seconds to give up after")
+    args = parser.parse_args(args)
+
+    import read
+    puzzles = list(read.InputReader().from_text(args.puzzle))
+    if not puzzles:
+        parser.error("not a puzzle: {0!r}".format(args.puzzle))
+
+    result = solve(puzzles[0], workers=args.workers, max_solutions=args.limit, timeout=args.timeout)
+    for solution in result.solutions:
+        print(read.to_text(solution))
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
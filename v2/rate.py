@@ -0,0 +1,170 @@
+"""
+Difficulty rating by the logic techniques a puzzle needs.
+
+    python -m rate puzzles.txt [--sort]
+
+The puzzle is solved with the techniques of TECHNIQUES only, always
+using the cheapest one that makes progress and starting over from the
+cheapest after every step, the way a person would. Whenever none of them
+makes progress the rater branches: it takes the pivot the Brancher would
+branch on and places the number of the solution there, counting a branch
+point. The rating is the cost of the hardest step taken, and the total
+adds up the cost of every step, which tells apart puzzles that need the
+same hardest technique.
+
+The chain techniques run on a Chains of their own, RATE_CHAINS, whose
+forcing chains give up after a number of assumptions instead of after a
+time limit, so a puzzle gets the same rating on any machine.
+"""
+import argparse
+
+import chains
+import classes2 as classes
+import solver
+
+# chain techniques of the rater, limited by steps rather than seconds
+RATE_CHAINS = chains.Chains(time_limit=None, assumptions=chains.MAX_ASSUMPTIONS)
+
+# (name, cost, technique) in the order the rater tries them. A technique
+# takes a Grid and returns how much progress it made (squares placed or
+# candidates removed), 0 if none
+TECHNIQUES = [
+    ("hidden single", 1.5, classes.Grid.hidden_singles),
+    ("naked single", 2.3, classes.Grid.naked_singles),
+    ("pointing", 2.6, classes.Grid.pointing),
+    ("box/line", 2.8, classes.Grid.box_line),
+    ("naked pair", 3.0, classes.Grid.naked_doubles),
+    ("x-wing", 3.2, classes.Grid.x_wing),
+    ("hidden pair", 3.4, classes.Grid.hidden_doubles),
+    ("naked triple", 3.6, classes.Grid.naked_triples),
+    ("swordfish", 3.8, classes.Grid.swordfish),
+    ("hidden triple", 4.0, classes.Grid.hidden_triples),
+    ("simple coloring", 4.4, RATE_CHAINS.simple_coloring),
+    ("naked quad", 5.0, classes.Grid.naked_quads),
+    ("jellyfish", 5.2, classes.Grid.jellyfish),
+    ("hidden quad", 5.4, classes.Grid.hidden_quads),
+    ("xy-chain", 6.6, RATE_CHAINS.xy_chains),
+    ("forcing chain", 8.0, RATE_CHAINS.forcing_chains),
+]
+# cost of a branch point, above every technique
+BRANCH_COST = 10.0
+
+# highest rating of each difficulty band
+BAND_LIMITS = (("easy", 2.3), ("medium", 4.0), ("hard", float("inf")))
+
+
+class Rating:
+    """Outcome of rate().
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    rating          float           cost of the hardest step
+
+    total           float           cost of every step added up
+
+    counts          dict            times each technique made progress,
+                                    in the order of TECHNIQUES
+
+    branches        int             branch points needed
+
+    band            str             difficulty band of the rating, see
+                                    BAND_LIMITS
+
+    """
+    def __init__(self, rating, total, counts, branches):
+        self.rating = rating
+        self.total = total
+        self.counts = counts
+        self.branches = branches
+
+    @property
+    def band(self):
+        for band, limit in BAND_LIMITS:
+            if self.rating <= limit:
+                return band
+
+    def breakdown(self):
+        """returns the counts, branches and ratings as a dict"""
+        return {"rating": self.rating, "total": round(self.total, 2), "branches": self.branches,
+                "techniques": {name: count for name, count in self.counts.items() if count}}
+
+    def __repr__(self):
+        return "Rating(rating={0}, total={1:.1f}, branches={2}, counts={3})".format(
+            self.rating, self.total, self.branches,
+            {name: count for name, count in self.counts.items() if count})
+
+
+def rate(puzzle, solution=None, brancher=None):
+    """Rates puzzle, a 9x9 list with a unique solution, and returns a Rating.
+        solution saves solving the puzzle first if it is already known.
+        Raises ValueError if the puzzle does not have exactly one solution"""
+    if solution is None:
+        result = solver.solve(puzzle, max_solutions=2)
+        if result.count != 1:
+            raise ValueError("puzzle has {0} solutions, a rating needs exactly one".format(
+                "several" if result.count else "no"))
+        solution = result.solution
+
+    grid = classes.Grid(puzzle)
+    answer = [number for row in solution for number in row]
+    brancher = brancher or classes.DEFAULT_BRANCHER
+    counts = {name: 0 for name, cost, technique in TECHNIQUES}
+    rating = 0.0
+    total = 0.0
+    branches = 0
+
+    while not grid.is_solved():
+        if not grid.solvable:
+            raise ValueError("solution does not solve the puzzle")
+
+        for name, cost, technique in TECHNIQUES:
+            if technique(grid):
+                counts[name] += 1
+                rating = max(rating, cost)
+                total += cost
+                break
+        else:
+            # nothing works, so branch into the alternative that holds the solution
+            branches += 1
+            rating = max(rating, BRANCH_COST)
+            total += BRANCH_COST
+            for index, number in brancher.choose(grid):
+                if answer[index] == number:
+                    grid.place(index, number)
+                    break
+            else:
+                raise ValueError("solution does not solve the puzzle")
+
+    return Rating(rating, total, counts, branches)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m rate", description="Rate the difficulty of puzzles.")
+    parser.add_argument("path", help="file of puzzles (81 character lines, 9 line grids, SDK or CSV)")
+    parser.add_argument("--sort", action="store_true", help="print the puzzles from easiest to hardest")
+    args = parser.parse_args(args)
+
+    import read
+    rated = ((rate_or_none(puzzle), puzzle) for puzzle in read.InputReader().from_file(args.path))
+    if args.sort:
+        rated = sorted(rated, key=lambda item: (item[0].rating, item[0].total) if item[0] else (BRANCH_COST + 1, 0))
+
+    for rating, puzzle in rated:
+        if rating is None:
+            print("{0:>19} {1}".format("not unique", read.to_text(puzzle)))
+        else:
+            print("{0:4.1f} {1:6.1f} {2:7} {3}".format(rating.rating, rating.total, rating.band, read.to_text(puzzle)))
+
+
+def rate_or_none(puzzle):
+    """returns rate(puzzle), None if puzzle does not have a unique solution"""
+    try:
+        return rate(puzzle)
+    except ValueError:
+        return None
+
+
+if __name__ == "__main__":
+    main()
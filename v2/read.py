@@ -1,41 +1,399 @@
 import os
-from PIL import ImageGrab
 import io
+import json
+import sqlite3
+from collections import OrderedDict
+from itertools import chain
+
+import canon
+import rate
+import solver
+
+# bytes read from a file at a time
+CHUNK_SIZE = 1 << 20
+# longer lines hold no puzzle and are dropped while reading
+MAX_LINE = 1 << 12
+
+# bytes.translate() table: "1"-"9" to 1-9, "0" and "." (empty squares) to 0
+# and every other byte to INVALID
+INVALID = 255
+CELLS = bytes(b"0123456789".find(i) if i in b"0123456789" else 0 if i == ord(".") else INVALID for i in range(256))
+# bytes.translate() table from 0-9 to the characters "0"-"9"
+DIGITS = bytes(range(48, 58)).ljust(256, b"?")
+
+# bytes left out of the rows of a 9 line grid, and the lines between its quadrants
+GRID_SEPARATORS = b" \t|+"
+GRID_LINES = b"-="
+
+# formats accepted by OutputWriter
+FORMATS = ("line", "grid", "csv")
+
+# entries SolutionDB keeps in memory
+CACHE_SIZE = 4096
+# values of Entry.count
+NO_SOLUTION, UNIQUE, MULTIPLE = range(3)
+
+
+class Entry:
+    """What SolutionDB knows about a puzzle.
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    solution        list or None    a solution as a 9x9 list
+
+    count           int             NO_SOLUTION, UNIQUE or MULTIPLE
+
+    difficulty      float or None   rating of the puzzle, if it has one
+
+    details         dict            anything else known about the
+                                    puzzle, like the search nodes it
+                                    took or a breakdown of its rating
+
+    """
+    def __init__(self, solution, count, difficulty=None, details=None):
+        self.solution = solution
+        self.count = count
+        self.difficulty = difficulty
+        self.details = details or {}
+
+    def __repr__(self):
+        return "Entry(count={0}, difficulty={1}, details={2})".format(self.count, self.difficulty, self.details)
 
 
 class SolutionDB:
-    db_path = ""
-    
-    def __init__(self):
-        pass
-        
- 
+    """Solutions cache in an SQLite file, with the most recently used
+    entries kept in memory as well.
+
+    Puzzles are stored by their canon.canonical_form(), so a relabelled,
+    transposed or reordered copy of a puzzle finds the entry of the
+    original, and the solution it gets back is mapped onto the copy.
+    Every lookup and store works out that form first, which is well
+    under a millisecond for most puzzles but can take a few hundred for
+    the rare ones that many transforms leave unchanged.
+
+        with SolutionDB("solutions.db") as db:
+            entry = db.solve(puzzle)
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    db_path         str             SQLite file, ":memory:" for a
+                                    database that is not saved
+
+    cache_size      int             entries kept in memory
+
+    hits            int             lookups answered from memory
+
+    misses          int             lookups that had to go to the file
+
+    """
+    db_path = "solutions.db"
+
+    def __init__(self, db_path=None, cache_size=CACHE_SIZE):
+        if db_path is not None:
+            self.db_path = db_path
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        # canonical key -> Entry of the canonical puzzle, least recently used first
+        self.cache = OrderedDict()
+
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS solutions (
+            puzzle BLOB PRIMARY KEY,
+            solution BLOB,
+            count INTEGER NOT NULL,
+            difficulty REAL,
+            details TEXT)""")
+        self.connection.commit()
+
+    def _remember(self, key, entry):
+        self.cache[key] = entry
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _get(self, key):
+        """returns the Entry of a canonical key, None if it is not stored"""
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        row = self.connection.execute(
+            "SELECT solution, count, difficulty, details FROM solutions WHERE puzzle = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        solution, count, difficulty, details = row
+        entry = Entry(to_grid(solution) if solution else None, count, difficulty, json.loads(details or "{}"))
+        self._remember(key, entry)
+        return entry
+
+    def lookup(self, puzzle):
+        """returns the Entry of puzzle, with the solution mapped onto puzzle,
+            or None if puzzle is not stored"""
+        key, transform = canon.canonical_form(puzzle)
+        entry = self._get(key)
+        if entry is None:
+            return None
+        solution = entry.solution and transform.invert(entry.solution)
+        return Entry(solution, entry.count, entry.difficulty, entry.details)
+
+    def store(self, puzzle, solution, count, difficulty=None, details=None):
+        """saves what is known about puzzle, replacing any older entry of it
+            (or of an equivalent puzzle)"""
+        key, transform = canon.canonical_form(puzzle)
+        solution = solution and transform.apply(solution)
+        entry = Entry(solution, count, difficulty, details)
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)",
+            (key, solution and bytes(chain.from_iterable(solution)), count, difficulty,
+             json.dumps(entry.details)))
+        self.connection.commit()
+        self._remember(key, entry)
+
+    def solve(self, puzzle, engine="trail", timeout=None):
+        """returns the Entry of puzzle, solving and storing it first if it is
+            not stored yet, with its rate.rate() rating if it has a unique
+            solution. Nothing is stored if the solver times out"""
+        entry = self.lookup(puzzle)
+        if entry is not None:
+            return entry
+
+        result = solver.solve(puzzle, engine=engine, max_solutions=2, timeout=timeout)
+        if result.timed_out and result.count < 2:
+            return None
+
+        count = min(result.count, MULTIPLE)
+        details = {"engine": result.engine, "nodes": result.nodes}
+        difficulty = None
+        if count == UNIQUE:
+            rating = rate.rate(puzzle, result.solution)
+            difficulty = rating.rating
+            details.update(rating.breakdown())
+
+        self.store(puzzle, result.solution, count, difficulty, details)
+        return Entry(result.solution, count, difficulty, details)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class InputReader:
-    def __init__(self):
-        pass
-    
+    """Streams puzzles out of text in any of these formats:
+
+        81 character lines  1-9 for numbers, 0 or . for empty squares,
+                            anything after the first space is ignored
+        9 line grids        one row per line, spaces and | + between the
+                            numbers and lines of - or = between quadrants
+                            are ignored (this covers SDK files as well),
+                            a grid cut short by any other line is dropped
+        CSV                 the puzzle as the first field, or 81 fields
+                            with one square each
+
+    Lines starting with # or [ (SDK comments and sections), headers and
+    anything else that is not a puzzle are skipped. Files are read in
+    binary chunks of chunk_size bytes, so memory use does not depend on the
+    size of the file.
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    chunk_size      int             bytes read from a file at a time
+
+    """
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
     def from_image(self):
         """ reads an image and uses image recognition to convert it
             to a compatible list
         """
         pass
-    
-    def from_text(self):
+
+    def from_text(self, text, flat=False):
         """ reads a variety of formats and converts it to a
             compatible list
+
+            yields every puzzle of text (a str) as a 9x9 list, or as 81
+            bytes of numbers if flat is True
         """
-        pass
-    
+        records = self.parse(io.BytesIO(text.encode()))
+        return records if flat else map(to_grid, records)
+
     def from_clipboard(self):
         """ Pulls either text or image from the clipboard and coverts
             it to a compatible list
         """
+        from PIL import ImageGrab
         img = ImageGrab.grabclipboard()
         pass
-    
-    def from_file(self):
+
+    def from_file(self, path, flat=False):
         """ Reads a text or image from a file and coverts it to a
             compatible list
+
+            yields every puzzle of the text file at path as a 9x9 list, or
+            as 81 bytes of numbers if flat is True
         """
-        pass
+        with open(path, "rb") as file:
+            records = self.parse(file)
+            yield from (records if flat else map(to_grid, records))
+
+    def lines(self, file):
+        """yields the lines of a binary file, ended by LF, CR or CRLF,
+            reading chunk_size bytes at a time. Lines over MAX_LINE bytes are
+            dropped, so a file without line ends never fills the memory"""
+        rest = b""
+        # the line being read is over MAX_LINE bytes
+        skipping = False
+        # the last chunk ended with a CR, which may be the first half of a CRLF
+        after_cr = False
+        while True:
+            chunk = file.read(self.chunk_size)
+            if not chunk:
+                break
+            if after_cr and chunk[:1] == b"\n":
+                chunk = chunk[1:]
+            after_cr = chunk[-1:] == b"\r"
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            if skipping:
+                end = chunk.find(b"\n")
+                if end < 0:
+                    continue
+                chunk = chunk[end + 1:]
+                skipping = False
+
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            if len(rest) > MAX_LINE:
+                rest = b""
+                skipping = True
+            yield from lines
+        if rest:
+            yield rest
+
+    def parse(self, file):
+        """yields every puzzle of a binary file as 81 bytes of numbers"""
+        rows = []
+
+        for line in self.lines(file):
+            line = line.strip()
+            # anything but a row ends the 9 line grid being read, so a grid
+            # with missing rows is dropped instead of taking rows of the next one
+            if not line or line[:1] in b"#[":
+                rows = []
+                continue
+
+            if b"," in line:
+                rows = []
+                fields = line.split(b",")
+                if len(fields) >= 81:
+                    line = b"".join(field.strip() or b"0" for field in fields[:81])
+                else:
+                    line = fields[0].strip().strip(b"\"")
+                record = line.translate(CELLS)
+                if len(record) == 81 and INVALID not in record:
+                    yield record
+                continue
+
+            token = line.split(None, 1)[0]
+            if len(token) == 81:
+                record = token.translate(CELLS)
+                if INVALID not in record:
+                    yield record
+                rows = []
+                continue
+
+            # one row of a 9 line grid
+            row = line.translate(None, GRID_SEPARATORS)
+            if not row.strip(GRID_LINES):
+                continue
+            row = row.translate(CELLS)
+            if len(row) == 9 and INVALID not in row:
+                rows.append(row)
+                if len(rows) == 9:
+                    yield b"".join(rows)
+                    rows = []
+            else:
+                rows = []
+
+
+class OutputWriter:
+    """Writes puzzles or solutions to a text file one at a time, so they never
+    have to be kept in memory.
+
+    fmt is one of FORMATS: "line" writes every grid as 81 characters, "grid"
+    as 9 lines followed by an empty line, with . for empty squares, and
+    "csv" as comma separated 81 character fields. A grid is a 9x9 list or
+    81 bytes of numbers, and None (no solution) is written as an empty
+    field.
+
+        with OutputWriter("solutions.txt") as writer:
+            for puzzle in InputReader().from_file("puzzles.txt"):
+                writer.write(solver.solve(puzzle).solution)
+
+    """
+    def __init__(self, file, fmt="line", chunk_size=CHUNK_SIZE):
+        if fmt not in FORMATS:
+            raise ValueError("unknown format {0!r}, expected one of {1}".format(fmt, FORMATS))
+
+        self.fmt = fmt
+        self.owned = isinstance(file, (str, os.PathLike))
+        self.file = open(file, "w", buffering=chunk_size) if self.owned else file
+
+    def write(self, *grids):
+        """writes one line (one block with "grid") made of grids"""
+        if self.fmt == "grid":
+            for grid in grids:
+                text = to_text(grid, b".") if grid is not None else "." * 81
+                self.file.write("\n".join(text[i:i + 9] for i in range(0, 81, 9)) + "\n\n")
+        else:
+            separator = "," if self.fmt == "csv" else " "
+            self.file.write(separator.join(to_text(grid) if grid is not None else "" for grid in grids) + "\n")
+
+    def write_all(self, grids):
+        """writes every grid of an iterable, one per line"""
+        for grid in grids:
+            self.write(grid)
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def to_grid(record):
+    """returns 81 bytes of numbers as a 9x9 list"""
+    return [list(record[i:i + 9]) for i in range(0, 81, 9)]
+
 
+def to_text(grid, empty=b"0"):
+    """returns a 9x9 list or 81 bytes of numbers as 81 characters, with empty
+        for the empty squares"""
+    if not isinstance(grid, (bytes, bytearray, memoryview)):
+        grid = bytes(chain.from_iterable(grid))
+    return bytes(grid).translate(DIGITS).replace(b"0", empty).decode()
@@ -0,0 +1,130 @@
+"""
+Depth first search that solves a single Grid in place.
+
+Instead of copying the grid for every branch, the search records every
+placement and candidate elimination on the grid's undo trail (see
+classes2.Grid) and unwinds back to a checkpoint when a branch fails. The
+logic techniques of the Grid run between branches and their eliminations
+are recorded the same way, so nothing is allocated per branch apart from
+the trail entries.
+"""
+from time import perf_counter
+
+import classes2 as classes
+
+
+def propagate(grid):
+    """Runs the techniques of the grid until none of them makes any more
+        progress. Returns False if the grid turned out not to be solvable"""
+    while grid.solvable and not grid.is_solved():
+        if grid.solve_singles():
+            continue
+        if not grid.solvable:
+            break
+        if not any(getattr(grid, technique)() for technique in grid.SEARCH_PASSES):
+            break
+    return grid.solvable
+
+
+class Search:
+    """Finds the solutions of grid by trail based backtracking.
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    grid            Grid            grid being searched, left as it was
+                                    given once run() returns
+
+    brancher        Brancher        chooses the pivot of every branch
+
+    limit           int or None     stop after this many solutions
+
+    solutions       list            solutions found, as 9x9 lists
+
+    count           int             number of solutions found
+
+    nodes           int             number of branch points
+
+    deadline        float or None   time.perf_counter() value to stop at
+
+    timed_out       bool            the search stopped at the deadline
+
+    """
+    def __init__(self, grid, brancher=None, limit=1, deadline=None):
+        self.grid = grid
+        self.brancher = brancher or classes.DEFAULT_BRANCHER
+        self.limit = limit
+        self.deadline = deadline
+        self.store = True
+
+        self.solutions = []
+        self.count = 0
+        self.nodes = 0
+        self.timed_out = False
+
+    def run(self, store=True):
+        """Searches the grid and returns the list of solutions found. If store
+            is False only count is kept"""
+        grid = self.grid
+        self.store = store
+        recording = grid.trail is not None
+        checkpoint = grid.checkpoint()
+
+        try:
+            self._search()
+        finally:
+            grid.undo(checkpoint)
+            if not recording:
+                grid.trail = None
+
+        return self.solutions
+
+    def _search(self):
+        """returns True once the search should stop"""
+        grid = self.grid
+
+        if not propagate(grid):
+            return False
+
+        if grid.is_solved():
+            self.count += 1
+            if self.store:
+                self.solutions.append(grid.copy_grid())
+            return self.limit is not None and self.count >= self.limit
+
+        self.nodes += 1
+        if self.deadline is not None and perf_counter() > self.deadline:
+            self.timed_out = True
+            return True
+
+        for index, number in self.brancher.choose(grid):
+            checkpoint = grid.checkpoint()
+            grid.place(index, number)
+            stop = self._search()
+            grid.undo(checkpoint)
+
+            if stop:
+                return True
+
+            # every solution with this placement has been found, so the
+            # rest of the branches can do without it
+            if not grid.eliminate(index, classes.NUMBER_BITS[number]):
+                return False
+
+        return False
+
+
+def count_solutions(grid, limit=2, brancher=None):
+    """returns the number of solutions of grid, stopping as soon as limit
+        solutions have been found (limit=2 tells whether it has exactly one).
+        The search runs on grid itself, which is left as it was"""
+    run = Search(grid, brancher, limit=limit)
+    run.run(store=False)
+    return run.count
+
+
+def first_solution(grid, brancher=None):
+    """returns the first solution of grid as a 9x9 list, or None if it has none"""
+    solutions = Search(grid, brancher, limit=1).run()
+    return solutions[0] if solutions else None
@@ -0,0 +1,451 @@
+"""
+Solving service over HTTP, using only the standard library.
+
+    python -m service [--host HOST] [--port PORT] [-j WORKERS]
+                      [--batch-size SIZE] [--batch-delay SECONDS]
+                      [--batch-budget SECONDS]
+                      [--timeout SECONDS] [--max-pending REQUESTS]
+
+Endpoints:
+
+    POST /solve     the body is a puzzle in any format read.InputReader
+                    accepts, or JSON {"puzzle": ..., "timeout": seconds}.
+                    The answer is JSON with the status (one of
+                    solver.SOLVED, UNSOLVABLE and TIMEOUT), the solution
+                    as 81 characters (null if there is none), whether it
+                    is unique, the engine that found it, the branch
+                    points it took and the seconds spent in the service
+    GET /stats      counters of the service, as JSON
+
+Requests that arrive together are micro-batched: up to batch_size
+puzzles, or as many as arrive within batch_delay seconds of the first,
+are propagated together by the batch engine (batch.propagate, which
+needs numpy) in a worker process, which then searches the puzzles
+propagation left unsolved with the trail engine for up to batch_budget
+seconds. Whatever that does not cover is solved one at a time in the
+same process pool, within the timeout of its request, so a hard puzzle
+never holds up the easy ones of its batch for long and no solving ever
+runs on the event loop. Without numpy every puzzle goes straight to the
+trail engine.
+
+Once max_pending requests are being solved, new ones are answered with
+503 and a Retry-After header straight away instead of queueing without
+bound.
+"""
+import argparse
+import asyncio
+import importlib.util
+import io
+import json
+import math
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import read
+import solver
+
+HOST = "127.0.0.1"
+PORT = 8765
+# puzzles propagated together, and how long the first one waits for others
+BATCH_SIZE = 256
+BATCH_DELAY = 0.002
+# seconds a batch may spend searching the puzzles propagation leaves, the
+# rest are searched one at a time
+BATCH_BUDGET = 0.02
+# seconds a request may take unless it asks for less
+TIMEOUT = 10.0
+# requests being solved at once before new ones are turned away
+MAX_PENDING = 1024
+# largest request body accepted, in bytes
+MAX_BODY = 1 << 16
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def _solve_batch(data, engine, budget):
+    """worker: propagates the puzzles of data (81 bytes of numbers each)
+        together, then searches the ones left unsolved with engine for at
+        most budget seconds in all. Returns the _solve_one() tuple of each
+        puzzle, with the status None for the ones the budget did not cover"""
+    import numpy as np
+    import batch
+
+    began = perf_counter()
+    digits = np.frombuffer(data, dtype=np.uint8).reshape(-1, 81).copy()
+    masks = np.zeros(digits.shape, dtype=np.uint16)
+    valid = batch.propagate(digits, masks)
+    solved = valid & (digits != 0).all(axis=1)
+
+    results = []
+    for done, ok, row in zip(solved.tolist(), valid.tolist(), digits):
+        left = budget - (perf_counter() - began)
+        if done:
+            # singles leave no choice, so a puzzle they solve has one solution
+            results.append((solver.SOLVED, row.tobytes(), 1, 0, "batch"))
+        elif not ok:
+            results.append((solver.UNSOLVABLE, None, 0, 0, "batch"))
+        elif left > 0:
+            result = _solve_one(row.tobytes(), engine, left)
+            results.append(result if result[0] != solver.TIMEOUT else (None,) + result[1:])
+        else:
+            results.append((None, None, 0, 0, engine))
+    return results
+
+
+def _solve_one(record, engine, timeout):
+    """worker: solves one puzzle (81 bytes of numbers), returns (status,
+        solution as 81 bytes or None, solutions found up to 2, nodes, engine)"""
+    result = solver.solve(read.to_grid(record), engine=engine, max_solutions=2, timeout=timeout)
+    solution = result.solution and bytes(number for row in result.solution for number in row)
+    return result.status, solution, result.count, result.nodes, engine
+
+
+def _answer(status, solution, count, nodes, engine):
+    """returns the JSON answer for the result of _solve_one()"""
+    return {"status": status, "solution": solution and read.to_text(solution),
+            "unique": count == 1 if solution else None, "engine": engine, "nodes": nodes}
+
+
+class Service:
+    """Answers solve requests, see the module docstring.
+
+        service = Service(workers=4)
+        await service.start("127.0.0.1", 8765)
+        await service.serve_forever()
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    workers         int or None     worker processes (every core if None)
+
+    batch_size      int             most puzzles propagated together
+
+    batch_delay     float           seconds a batch waits to fill up
+
+    batch_budget    float           seconds a batch may spend searching
+                                    the puzzles propagation leaves
+
+    timeout         float           seconds a request may take unless it
+                                    asks for less
+
+    max_pending     int             requests being solved at once before
+                                    new ones get 503
+
+    engine          str             solver engine for the puzzles that
+                                    propagation does not solve
+
+    batching        bool            puzzles are micro-batched, False if
+                                    numpy is not installed
+
+    pending         int             requests being solved
+
+    stats           Counter         requests, answers of each status,
+                                    rejected requests, requests that
+                                    failed with 500, batches, puzzles
+                                    batched and puzzles searched
+
+    """
+    def __init__(self, workers=None, batch_size=BATCH_SIZE, batch_delay=BATCH_DELAY, batch_budget=BATCH_BUDGET,
+                 timeout=TIMEOUT, max_pending=MAX_PENDING, engine="trail"):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.batch_budget = batch_budget
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.engine = engine
+        self.batching = batch_size > 1 and importlib.util.find_spec("numpy") is not None
+        self.pending = 0
+        self.stats = Counter()
+
+        self.executor = None
+        self.server = None
+        # (record, future, deadline) of every puzzle waiting for a batch
+        self.queue = None
+        self._batcher = None
+        # running batches and searches, kept so they are not garbage collected
+        self._tasks = set()
+
+    async def start(self, host=HOST, port=PORT):
+        """starts the worker processes and listens on host and port"""
+        self.executor = ProcessPoolExecutor(self.workers)
+        self.queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    async def close(self):
+        """stops listening, cancels the batcher and shuts down the workers"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def solve(self, record, timeout=None):
+        """returns the answer for a puzzle (81 bytes of numbers) as a dict,
+            with the status solver.TIMEOUT if it takes more than timeout
+            seconds (self.timeout if None or larger)"""
+        loop = asyncio.get_running_loop()
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        started = perf_counter()
+        future = loop.create_future()
+
+        if self.batching:
+            self.queue.put_nowait((record, future, started + timeout))
+        else:
+            self._search(record, future, started + timeout)
+
+        try:
+            answer = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            answer = {"status": solver.TIMEOUT, "solution": None, "unique": None, "engine": self.engine,
+                      "nodes": 0}
+
+        answer["elapsed"] = round(perf_counter() - started, 6)
+        self.stats[answer["status"]] += 1
+        return answer
+
+    async def _batch_loop(self):
+        """takes the puzzles of the queue in batches of up to batch_size,
+            waiting at most batch_delay after the first for the others"""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            closes = loop.time() + self.batch_delay
+
+            while len(items) < self.batch_size:
+                if self.queue.empty():
+                    left = closes - loop.time()
+                    if left <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(self.queue.get(), left))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    items.append(self.queue.get_nowait())
+
+            self._spawn(self._run_batch(items))
+
+    async def _run_batch(self, items):
+        """solves a batch in a worker and answers its puzzles, searching the
+            ones the batch budget did not cover one at a time"""
+        loop = asyncio.get_running_loop()
+        self.stats["batches"] += 1
+        self.stats["batched"] += len(items)
+
+        try:
+            results = await loop.run_in_executor(self.executor, _solve_batch,
+                                                 b"".join(record for record, future, deadline in items),
+                                                 self.engine, self.batch_budget)
+        except Exception as error:
+            for record, future, deadline in items:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for (record, future, deadline), result in zip(items, results):
+            if future.done():
+                continue
+            if result[0] is None:
+                self._search(record, future, deadline)
+            else:
+                future.set_result(_answer(*result))
+
+    def _search(self, record, future, deadline):
+        """solves one puzzle with the engine in a worker, answering future"""
+        async def search():
+            self.stats["searched"] += 1
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, _solve_one, record, self.engine, max(deadline - perf_counter(), 0.0))
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+                return
+
+            if not future.done():
+                future.set_result(_answer(*result))
+
+        self._spawn(search())
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def handle(self, reader, writer):
+        """serves the HTTP/1.1 requests of one connection"""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, OverflowError, asyncio.LimitOverrunError) as error:
+                    await respond(writer, 413 if isinstance(error, OverflowError) else 400,
+                                  {"error": str(error)}, close=True)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                try:
+                    code, answer, extra = await self.route(method, path, body)
+                except Exception as error:
+                    # a worker that died, say, fails the request but not the service
+                    self.stats["errors"] += 1
+                    code, answer, extra = 500, {"error": "{0}: {1}".format(type(error).__name__, error)}, {}
+                close = headers.get("connection", "").lower() == "close"
+                await respond(writer, code, answer, extra, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        """returns (status code, JSON answer, extra headers) for a request"""
+        if path == "/stats":
+            if method != "GET":
+                return 405, {"error": "use GET"}, {"Allow": "GET"}
+            return 200, dict(self.stats, pending=self.pending, batching=self.batching), {}
+
+        if path != "/solve":
+            return 404, {"error": "no such endpoint, use POST /solve or GET /stats"}, {}
+        if method != "POST":
+            return 405, {"error": "use POST"}, {"Allow": "POST"}
+
+        self.stats["requests"] += 1
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            return 503, {"error": "too many pending requests"}, {"Retry-After": "1"}
+
+        try:
+            record, timeout = parse_body(body)
+        except ValueError as error:
+            return 400, {"error": str(error)}, {}
+
+        self.pending += 1
+        try:
+            return 200, await self.solve(record, timeout), {}
+        finally:
+            self.pending -= 1
+
+
+def parse_body(body):
+    """returns (81 bytes of numbers, timeout or None) from the body of a solve
+        request, raises ValueError if it holds no puzzle or a timeout that is
+        not a positive number of seconds"""
+    timeout = None
+    if body.lstrip().startswith(b"{"):
+        try:
+            request = json.loads(body)
+            text = request["puzzle"]
+            timeout = request.get("timeout")
+            timeout = None if timeout is None else float(timeout)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('expected JSON {"puzzle": ..., "timeout": seconds}')
+        if not isinstance(text, str):
+            raise ValueError("the puzzle must be a string")
+        if timeout is not None and not (math.isfinite(timeout) and timeout > 0):
+            raise ValueError("the timeout must be a positive number of seconds")
+        body = text.encode()
+
+    for record in read.InputReader().parse(io.BytesIO(body)):
+        return record, timeout
+    raise ValueError("no puzzle in the request")
+
+
+async def read_request(reader):
+    """returns (method, path, headers, body) of the next request on a
+        connection, None once the client closed it. Raises ValueError for a
+        malformed request and OverflowError for one whose body is over
+        MAX_BODY bytes"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+
+    try:
+        method, path, version = line.decode("latin-1").split()
+    except ValueError:
+        raise ValueError("malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise OverflowError("request body over {0} bytes".format(MAX_BODY))
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?", 1)[0], headers, body
+
+
+async def respond(writer, code, answer, extra=None, close=False):
+    """writes a JSON response"""
+    body = json.dumps(answer).encode()
+    head = ["HTTP/1.1 {0} {1}".format(code, REASONS.get(code, "")),
+            "Content-Type: application/json",
+            "Content-Length: {0}".format(len(body)),
+            "Connection: {0}".format("close" if close else "keep-alive")]
+    head += ["{0}: {1}".format(name, value) for name, value in (extra or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def serve(host, port, **options):
+    service = Service(**options)
+    server = await service.start(host, port)
+    address = server.sockets[0].getsockname()
+    print("listening on http://{0}:{1} ({2})".format(address[0], address[1],
+          "micro-batching" if service.batching else "no numpy, not batching"), file=sys.stderr)
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m service", description="Serve the solver over HTTP.")
+    parser.add_argument("--host", default=HOST, help="address to listen on (default: {0})".format(HOST))
+    parser.add_argument("--port", type=int, default=PORT, help="port to listen on (default: {0})".format(PORT))
+    parser.add_argument("-j", "--workers", type=int, help="worker processes (default: every core)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="most puzzles propagated together, 1 to turn batching off (default: {0})".format(
+                            BATCH_SIZE))
+    parser.add_argument("--batch-delay", type=float, default=BATCH_DELAY,
+                        help="seconds a batch waits to fill up (default: {0})".format(BATCH_DELAY))
+    parser.add_argument("--batch-budget", type=float, default=BATCH_BUDGET,
+                        help="seconds a batch may spend searching (default: {0})".format(BATCH_BUDGET))
+    parser.add_argument("--timeout", type=float, default=TIMEOUT,
+                        help="most seconds a request may take (default: {0})".format(TIMEOUT))
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="requests solved at once before answering 503 (default: {0})".format(MAX_PENDING))
+    parser.add_argument("--engine", default="trail", choices=("trail", "dlx", "logic"),
+                        help="engine for the puzzles propagation does not solve (default: trail)")
+    args = parser.parse_args(args)
+
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, batch_size=args.batch_size,
+                          batch_delay=args.batch_delay, batch_budget=args.batch_budget, timeout=args.timeout,
+                          max_pending=args.max_pending, engine=args.engine))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
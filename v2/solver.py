@@ -0,0 +1,189 @@
+"""
+Headless solving API. Nothing here draws or imports pygame, so it can be
+used from scripts and server workers as well as from the UI:
+
+    result = solver.solve(puzzle, engine="trail", max_solutions=1, timeout=None)
+    if result.solution:
+        ...
+
+puzzle is a list of lists of int with dimensions 9x9, as returned by
+Grid.copy_grid(), with 0 for empty squares.
+"""
+from time import perf_counter
+
+import classes2 as classes
+import dlx
+import search
+
+# names accepted by solve(engine=...), "parallel" runs the trail engine
+# across every core (see parallel.py)
+ENGINES = ("trail", "dlx", "logic", "parallel")
+
+# values of Result.status
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+TIMEOUT = "timeout"
+
+
+class Result:
+    """Outcome of solve().
+
+    Properties:
+
+    variable       |type           |description
+    ------------------------------------------------------------
+    status          str             SOLVED, UNSOLVABLE or TIMEOUT
+
+    solutions       list            solutions found, as 9x9 lists
+
+    count           int             number of solutions found, which is
+                                    the exact total if it is below the
+                                    max_solutions given to solve() and
+                                    the search did not time out
+
+    timed_out       bool            the search stopped at the timeout
+
+    engine          str             engine that was used
+
+    nodes           int             branch points explored
+
+    elapsed         float           seconds spent solving
+
+    """
+    def __init__(self, status, solutions, count, engine, nodes=0, elapsed=0.0, timed_out=False):
+        self.status = status
+        self.solutions = solutions
+        self.count = count
+        self.timed_out = timed_out
+        self.engine = engine
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def solution(self):
+        """the first solution found, None if there is none"""
+        return self.solutions[0] if self.solutions else None
+
+    def __repr__(self):
+        return "Result(status={0!r}, count={1}, engine={2!r}, nodes={3}, elapsed={4:.6f})".format(
+            self.status, self.count, self.engine, self.nodes, self.elapsed)
+
+
+def has_conflicts(grid):
+    """returns True if a number appears twice in a row, column or quadrant of grid"""
+    return max(grid.counts) > 1
+
+
+def check_puzzle(puzzle):
+    """raises ValueError unless puzzle is 9 rows of 9 ints from 0 to 9"""
+    if len(puzzle) != 9 or any(len(row) != 9 for row in puzzle):
+        raise ValueError("expected a 9x9 puzzle")
+    for row in puzzle:
+        for number in row:
+            if type(number) is not int or not 0 <= number <= 9:
+                raise ValueError("expected numbers from 0 to 9, got {0!r}".format(number))
+
+
+def solve(puzzle, *, engine="trail", max_solutions=1, timeout=None, brancher=None):
+    """Solves puzzle and returns a Result.
+
+    engine is one of ENGINES, max_solutions (None for no limit) stops the
+    search once that many solutions have been found, and timeout is a
+    number of seconds after which the search gives up. brancher is passed
+    to the engines that branch with a classes.Brancher. Raises ValueError
+    if puzzle is not a 9x9 grid of numbers from 0 to 9.
+    """
+    if engine not in ENGINES:
+        raise ValueError("unknown engine {0!r}, expected one of {1}".format(engine, ENGINES))
+    check_puzzle(puzzle)
+
+    if engine == "parallel":
+        import parallel
+        return parallel.solve(puzzle, max_solutions=max_solutions, timeout=timeout, brancher=brancher)
+
+    start = perf_counter()
+    deadline = None if timeout is None else start + timeout
+
+    if engine == "dlx":
+        links = dlx.DancingLinks(puzzle)
+        count, solutions = links.search(limit=max_solutions, deadline=deadline)
+        nodes, timed_out = links.nodes, links.timed_out
+    else:
+        grid = classes.Grid(puzzle)
+        if has_conflicts(grid):
+            count, solutions, nodes, timed_out = 0, [], 0, False
+        elif engine == "trail":
+            run = search.Search(grid, brancher, limit=max_solutions, deadline=deadline)
+            solutions = run.run()
+            count, nodes, timed_out = run.count, run.nodes, run.timed_out
+        else:
+            count, solutions, nodes, timed_out = solve_logic(grid, max_solutions, deadline, brancher)
+
+    if count:
+        status = SOLVED
+    elif timed_out:
+        status = TIMEOUT
+    else:
+        status = UNSOLVABLE
+
+    return Result(status, solutions, count, engine, nodes, perf_counter() - start, timed_out)
+
+
+def count_solutions(puzzle, limit=2, *, engine="trail", brancher=None):
+    """Returns the number of solutions of puzzle, stopping as soon as limit
+    solutions have been found (None for no limit), so the default limit=2
+    tells whether the puzzle has none, exactly one or several solutions.
+
+    No solutions are stored while counting. puzzle can also be a
+    classes.Grid, which the "trail" engine then searches in place and
+    leaves as it was, so a caller that keeps one Grid (like a generator
+    removing clues) reuses its propagated state instead of rebuilding it.
+    """
+    if engine not in ENGINES:
+        raise ValueError("unknown engine {0!r}, expected one of {1}".format(engine, ENGINES))
+    if not isinstance(puzzle, classes.Grid):
+        check_puzzle(puzzle)
+
+    if engine in ("dlx", "parallel") and isinstance(puzzle, classes.Grid):
+        puzzle = puzzle.copy_grid()
+    if engine == "dlx":
+        return dlx.count_solutions(puzzle, limit)
+    if engine == "parallel":
+        return solve(puzzle, engine=engine, max_solutions=limit, brancher=brancher).count
+
+    grid = puzzle if isinstance(puzzle, classes.Grid) else classes.Grid(puzzle)
+    if has_conflicts(grid):
+        return 0
+    if engine == "trail":
+        return search.count_solutions(grid, limit, brancher)
+    return solve_logic(grid.copy(), limit, None, brancher)[0]
+
+
+def solve_logic(grid, limit, deadline, brancher=None):
+    """The original step by step solving loop: keeps a stack of grids, runs
+        Grid.solve() on the last one and replaces it with the grids returned
+        by brute_force. Returns (count, solutions, nodes, timed_out)"""
+    grids = [grid]
+    solutions = []
+    nodes = 0
+
+    while grids:
+        if deadline is not None and perf_counter() > deadline:
+            return len(solutions), solutions, nodes, True
+
+        current_grid = grids[-1]            # choose the last grid in the list of grids
+        result = current_grid.solve(brancher)   # do a single step in the solving process
+
+        if not current_grid.solvable:       # if the grid is no longer solvable, delete it
+            grids.pop()
+        elif current_grid.is_solved():      # if the grid has been solved
+            grids.pop()
+            solutions.append(current_grid.copy_grid())
+            if limit is not None and len(solutions) >= limit:
+                break
+        elif result:                        # if the return value is a list of grids (brute force)
+            nodes += 1
+            grids.pop()                         # remove the current grid from the list
+            grids.extend(result)                # replace it with the different possibilities
+
+    return len(solutions), solutions, nodes, False
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import batch
+import dlx
+from conftest import conflicting_grid, is_solution, partial_grid, random_solution
+
+
+def test_solutions_are_valid(grids):
+    for grid, solution in zip(grids, batch.solve_batch(grids)):
+        if dlx.count_solutions(grid, 1):
+            assert is_solution(solution, grid)
+        else:
+            assert solution is None
+
+
+def test_hard_puzzles(hard):
+    assert batch.solve_batch(hard) == [dlx.first_solution(puzzle) for puzzle in hard]
+
+
+def test_propagation_solves_easy_puzzles():
+    # a solution with one square missing from every row is all singles
+    rng = random.Random(2)
+    solution = random_solution(rng)
+    puzzle = [row[:] for row in solution]
+    for row in range(9):
+        puzzle[row][rng.randrange(9)] = 0
+
+    batch_solver = batch.BatchSolver([puzzle])
+    batch_solver.propagate()
+    assert batch_solver.solved.all() and batch.to_grids(batch_solver.digits) == [solution]
+
+
+def test_propagation_finds_conflicts():
+    rng = random.Random(3)
+    puzzles = [conflicting_grid(random_solution(rng), rng) for i in range(10)]
+    batch_solver = batch.BatchSolver(puzzles)
+    batch_solver.propagate()
+    assert not batch_solver.valid.any()
+
+
+def test_chunk_size_does_not_change_the_result(grids):
+    rng = random.Random(4)
+    puzzles = grids + [partial_grid(random_solution(rng), rng, 0.4) for i in range(20)]
+    whole = batch.BatchSolver(puzzles)
+    whole.propagate()
+    chunked = batch.BatchSolver(puzzles, chunk_size=7)
+    chunked.propagate()
+    assert (whole.digits == chunked.digits).all() and (whole.masks == chunked.masks).all()
+    assert (whole.valid == chunked.valid).all()
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+import batchsolve
+import dlx
+import read
+from conftest import HARD, conflicting_grid, from_text, random_solution
+
+
+@pytest.fixture
+def puzzles(tmp_path):
+    """a file of the hard puzzles with a grid with conflicts in between"""
+    rng = random.Random(6)
+    conflict = read.to_text(conflicting_grid(random_solution(rng), rng))
+    path = tmp_path / "puzzles.txt"
+    path.write_text("\n".join(HARD[:2] + [conflict] + HARD[2:]) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("engine", ["dlx", "trail", "batch"])
+def test_solutions_in_input_order(puzzles, tmp_path, engine):
+    if engine == "batch":
+        pytest.importorskip("numpy")
+    output = tmp_path / "solutions.txt"
+    counts, rate = batchsolve.solve_file(puzzles, str(output), workers=2, engine=engine)
+
+    expected = [read.to_text(dlx.first_solution(from_text(text))) for text in HARD]
+    expected.insert(2, "")
+    assert output.read_text().split("\n")[:-1] == expected
+    assert counts == {batchsolve.SOLVED: 5, batchsolve.UNSOLVABLE: 1, batchsolve.TIMEOUT: 0}
+
+
+def test_range(puzzles, tmp_path):
+    output = tmp_path / "solutions.txt"
+    counts, rate = batchsolve.solve_file(puzzles, str(output), workers=1, start=3, stop=5)
+    assert counts[batchsolve.SOLVED] == 2 and len(output.read_text().split()) == 2
+
+
+def test_batch_engine_has_no_timeout(puzzles):
+    with pytest.raises(ValueError):
+        batchsolve.solve_file(puzzles, engine="batch", timeout=1)
@@ -0,0 +1,31 @@
+import random
+
+import canon
+from conftest import HARD, from_text, partial_grid, random_solution, random_transform
+
+
+def test_canonical_form_ignores_transforms():
+    rng = random.Random(5)
+    solution = random_solution(rng)
+    diagonal = [[row + 1 if col == row else 0 for col in range(9)] for row in range(9)]
+    grids = [from_text(text) for text in HARD] + [solution, diagonal, [[0] * 9 for i in range(9)]]
+    grids += [partial_grid(solution, rng, share) for share in (0.2, 0.3, 0.5)]
+
+    for grid in grids:
+        key, transform = canon.canonical_form(grid)
+        assert bytes(number for row in transform.apply(grid) for number in row) == key
+        assert transform.invert(transform.apply(grid)) == grid
+        others = [random_transform(rng).apply(grid) for i in range(4)]
+        assert all(canon.canonical_form(other)[0] == key for other in others)
+        assert canon.fingerprint(others[0]) == canon.fingerprint(grid)
+
+
+def test_different_puzzles_differ(hard):
+    assert len({canon.canonical_form(puzzle)[0] for puzzle in hard}) == len(hard)
+    assert len({canon.fingerprint(puzzle, bits=128) for puzzle in hard}) == len(hard)
+    assert all(canon.fingerprint(puzzle, bits=128) < 1 << 128 for puzzle in hard)
+
+
+def test_identity_transform(hard):
+    transform = canon.Transform()
+    assert transform.apply(hard[0]) == hard[0] and transform.invert(hard[0]) == hard[0]
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import corpus
+import read
+from conftest import HARD, partial_grid, random_solution
+
+
+@pytest.fixture
+def texts(tmp_path):
+    """two text files, of the hard puzzles and of 50 random partial grids"""
+    rng = random.Random(8)
+    grids = [partial_grid(random_solution(rng), rng, 0.4) for i in range(50)]
+    first, second = tmp_path / "hard.txt", tmp_path / "partial.txt"
+    first.write_text("\n".join(HARD) + "\n")
+    second.write_text("\n".join(read.to_text(grid) for grid in grids) + "\n")
+    records = [text.encode().translate(read.CELLS) for text in HARD] + \
+        [bytes(number for row in grid for number in row) for grid in grids]
+    return [str(first), str(second)], np.frombuffer(b"".join(records), dtype=np.uint8).reshape(-1, 81)
+
+
+def test_pack_and_unpack():
+    cells = np.random.default_rng(0).integers(0, 10, (100, 81), dtype=np.uint8)
+    records = corpus.pack(cells)
+    assert records.shape == (100, corpus.RECORD_SIZE)
+    assert (corpus.unpack(records) == cells).all()
+
+
+def test_convert_and_read(texts, tmp_path, monkeypatch):
+    # a small chunk size, so convert() writes the second file in several chunks
+    monkeypatch.setattr(corpus, "CHUNK_SIZE", 16)
+    paths, cells = texts
+    path = str(tmp_path / "puzzles.sdc")
+    assert corpus.convert(paths, path) == len(cells)
+    assert corpus.is_corpus(path) and not corpus.is_corpus(paths[0])
+
+    with corpus.Corpus(path) as puzzles:
+        assert len(puzzles) == len(cells)
+        assert (puzzles[:] == cells).all() and (puzzles[3:20] == cells[3:20]).all()
+        assert (puzzles[0] == cells[0]).all() and (puzzles[-1] == cells[-1]).all()
+        assert puzzles.section(0) == (0, len(HARD)) and puzzles.section(1) == (len(HARD), len(cells))
+
+
+def test_no_index(texts, tmp_path):
+    paths, cells = texts
+    path = str(tmp_path / "puzzles.sdc")
+    corpus.convert(paths, path, index=False)
+    with corpus.Corpus(path) as puzzles:
+        assert puzzles.sections is None and (puzzles[:] == cells).all()
+
+
+def test_not_a_corpus(tmp_path):
+    path = tmp_path / "puzzles.sdc"
+    path.write_bytes(bytes(corpus.HEADER_SIZE))
+    with pytest.raises(ValueError):
+        corpus.Corpus(str(path))
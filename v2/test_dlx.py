@@ -0,0 +1,41 @@
+import random
+
+import dlx
+from conftest import from_text, is_solution, partial_grid, random_solution, SOLUTION
+
+
+def test_hard_puzzles_have_one_solution(hard):
+    for puzzle in hard:
+        solutions = dlx.all_solutions(puzzle, limit=2)
+        assert len(solutions) == 1 and is_solution(solutions[0], puzzle)
+
+
+def test_all_solutions_are_distinct_and_valid():
+    rng = random.Random(1)
+    for i in range(20):
+        puzzle = partial_grid(random_solution(rng), rng, 0.3)
+        solutions = dlx.all_solutions(puzzle, limit=50)
+        assert len({str(solution) for solution in solutions}) == len(solutions)
+        assert all(is_solution(solution, puzzle) for solution in solutions)
+        assert dlx.count_solutions(puzzle, 50) == len(solutions)
+
+
+def test_two_solutions():
+    # the 6 and 7 of rows 0 and 3 in columns 3 and 4 can swap places, as
+    # each pair shares its row and the quadrant of its columns
+    solution = from_text(SOLUTION)
+    puzzle = [row[:] for row in solution]
+    for row in (0, 3):
+        puzzle[row][3] = puzzle[row][4] = 0
+
+    solutions = dlx.all_solutions(puzzle)
+    assert len(solutions) == 2 and solution in solutions
+    assert all(is_solution(other, puzzle) for other in solutions)
+
+
+def test_limit_and_conflicts():
+    empty = [[0] * 9 for i in range(9)]
+    assert dlx.count_solutions(empty, 30) == 30
+    conflict = [row[:] for row in empty]
+    conflict[0][0] = conflict[0][5] = 4
+    assert dlx.count_solutions(conflict) == 0 and dlx.first_solution(conflict) is None
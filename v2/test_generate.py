@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+import canon
+import dlx
+import generate
+import rate
+from conftest import is_solution
+
+
+def test_random_solution():
+    rng = random.Random(12)
+    for i in range(10):
+        solution = generate.random_solution(rng)
+        assert is_solution(solution, solution)
+
+
+@pytest.mark.parametrize("symmetry", generate.SYMMETRIES)
+def test_puzzles_are_unique(symmetry):
+    rng = random.Random(13)
+    group = generate.SYMMETRIES[symmetry]
+    for i in range(5):
+        puzzle, solution = generate.generate(symmetry=symmetry, rng=rng)
+        assert dlx.all_solutions(puzzle, limit=2) == [solution]
+        # squares removed together are all empty or all clues
+        assert all(len({bool(puzzle[j // 9][j % 9]) for j in group(i)}) == 1 for i in range(81))
+
+
+def test_clues_and_band():
+    rng = random.Random(14)
+    puzzle, solution = generate.generate(clues=30, band="easy", rng=rng)
+    assert generate.clue_count(puzzle) <= 30 and rate.rate(puzzle, solution).band == "easy"
+    assert dlx.count_solutions(puzzle) == 1
+
+
+def test_gives_up():
+    # no puzzle with 10 clues has a unique solution
+    assert generate.generate(clues=10, rng=random.Random(15), attempts=2) is None
+
+
+def test_unknown_options():
+    with pytest.raises(ValueError):
+        generate.generate(symmetry="spiral")
+    with pytest.raises(ValueError):
+        generate.generate(band="impossible")
+
+
+def test_batch():
+    puzzles = list(generate.generate_batch(6, workers=2, seed=16))
+    assert len(puzzles) == 6
+    assert len({canon.fingerprint(puzzle) for puzzle, solution in puzzles}) == 6
+    assert all(dlx.all_solutions(puzzle, limit=2) == [solution] for puzzle, solution in puzzles)
+    assert list(generate.generate_batch(6, workers=2, seed=16)) == puzzles
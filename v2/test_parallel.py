@@ -0,0 +1,26 @@
+import classes2 as classes
+import dlx
+import parallel
+from conftest import LIMIT, is_solution
+
+
+def test_counts_match_dlx(grids):
+    for grid in grids[::8]:
+        for limit in (1, 2, LIMIT):
+            result = parallel.solve(grid, workers=2, max_solutions=limit)
+            assert result.count == dlx.count_solutions(grid, limit)
+            assert len({str(solution) for solution in result.solutions}) == result.count
+            assert all(is_solution(solution, grid) for solution in result.solutions)
+
+
+def test_hard_puzzles(hard):
+    for puzzle in hard:
+        result = parallel.solve(puzzle, workers=3, max_solutions=2)
+        assert result.count == 1 and result.solution == dlx.first_solution(puzzle)
+
+
+def test_split_covers_every_solution(grids):
+    for grid in grids[::4]:
+        grids, solutions, nodes = parallel.split(classes.Grid(grid), 8)
+        assert len(solutions) + sum(dlx.count_solutions(open_grid.copy_grid(), None) for open_grid in grids) == \
+            dlx.count_solutions(grid, None)
@@ -0,0 +1,58 @@
+import random
+from itertools import count
+
+import pytest
+
+import chains
+import generate
+import rate
+from conftest import random_solution
+
+
+@pytest.fixture(scope="module")
+def puzzles(hard):
+    rng = random.Random(17)
+    return hard + [generate.generate(rng=rng)[0] for i in range(10)]
+
+
+def test_ratings_do_not_depend_on_the_clock(puzzles, monkeypatch):
+    ratings = [rate.rate(puzzle).breakdown() for puzzle in puzzles]
+    # every reading of the clock is a second after the last, as on a very slow machine
+    clock = count()
+    monkeypatch.setattr(chains, "perf_counter", lambda: next(clock))
+    assert [rate.rate(puzzle).breakdown() for puzzle in puzzles] == ratings
+
+
+def test_singles_are_easy():
+    rng = random.Random(18)
+    solution = random_solution(rng)
+    puzzle = [row[:] for row in solution]
+    for row in range(9):
+        puzzle[row][rng.randrange(9)] = 0
+
+    rating = rate.rate(puzzle)
+    assert rating.band == "easy" and rating.branches == 0
+
+
+def test_rating_is_the_hardest_step(puzzles):
+    for puzzle in puzzles:
+        rating = rate.rate(puzzle)
+        costs = [cost for name, cost, technique in rate.TECHNIQUES if rating.counts[name]]
+        costs += [rate.BRANCH_COST] * bool(rating.branches)
+        assert rating.rating == max(costs)
+        assert rating.total == pytest.approx(rate.BRANCH_COST * rating.branches + sum(
+            cost * rating.counts[name] for name, cost, technique in rate.TECHNIQUES))
+    assert rate.rate(puzzles[0]).band == "hard"
+
+
+def test_puzzles_without_one_solution():
+    empty = [[0] * 9 for i in range(9)]
+    with pytest.raises(ValueError):
+        rate.rate(empty)
+    assert rate.rate_or_none(empty) is None
+
+
+def test_wrong_solution(hard):
+    solution = [[(row * 3 + row // 3 + col) % 9 + 1 for col in range(9)] for row in range(9)]
+    with pytest.raises(ValueError):
+        rate.rate(hard[0], solution)
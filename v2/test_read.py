@@ -0,0 +1,110 @@
+import io
+import random
+
+import pytest
+
+import dlx
+import read
+from conftest import HARD, conflicting_grid, from_text, is_solution, random_solution, random_transform
+
+PUZZLE = HARD[0]
+RECORD = PUZZLE.encode().translate(read.CELLS)
+ROWS = [PUZZLE[i:i + 9] for i in range(0, 81, 9)]
+
+FORMATS = {
+    "line": PUZZLE + "\n",
+    "dots and comment": PUZZLE.replace("0", ".") + " rated 11.0\n",
+    "grid": "\n".join(ROWS) + "\n",
+    "sdk": "#A someone\n[Puzzle]\n" + "\n".join(row.replace("0", ".") for row in ROWS) + "\n",
+    "boxed grid": "".join(("+-------+-------+-------+\n" if i % 3 == 0 else "") +
+                          "| {0} {1} {2} | {3} {4} {5} | {6} {7} {8} |\n".format(*row.replace("0", "."))
+                          for i, row in enumerate(ROWS)) + "+-------+-------+-------+\n",
+    "csv": "quizzes,solutions\n" + PUZZLE + "," + "1" * 81 + "\n",
+    "csv quoted": '"' + PUZZLE + '",3.5\n',
+    "csv squares": ",".join(c if c != "0" else "" for c in PUZZLE) + "\n",
+    "cr line ends": "\r".join(ROWS) + "\r",
+    "crlf line ends": "\r\n".join(ROWS) + "\r\n",
+}
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_formats(name):
+    assert list(read.InputReader().from_text(FORMATS[name], flat=True)) == [RECORD]
+
+
+def test_grids():
+    assert list(read.InputReader().from_text("\n".join(HARD))) == [from_text(text) for text in HARD]
+
+
+@pytest.mark.parametrize("end", ["", "# comment", "[Puzzle]", "a,b"])
+def test_grid_with_missing_rows_is_dropped(end):
+    """a grid cut short by another line does not take rows of the next one"""
+    text = "\n".join(ROWS[:8] + [end] + ROWS * 3) + "\n"
+    assert list(read.InputReader().from_text(text, flat=True)) == [RECORD] * 3
+
+
+def test_chunks(tmp_path):
+    """puzzles split across chunks, and lines too long to hold one, are read
+        the same with any chunk size"""
+    path = tmp_path / "puzzles.txt"
+    path.write_text("x" * (3 * read.MAX_LINE) + "\n" + "".join(FORMATS.values()))
+
+    for chunk_size in (1, 7, 100, read.CHUNK_SIZE):
+        records = list(read.InputReader(chunk_size).from_file(str(path), flat=True))
+        assert records == [RECORD] * len(FORMATS)
+
+
+@pytest.mark.parametrize("fmt", read.FORMATS)
+def test_output_is_read_back(fmt):
+    grids = [from_text(text) for text in HARD]
+    file = io.StringIO()
+    with read.OutputWriter(file, fmt) as writer:
+        writer.write_all(grids)
+    assert list(read.InputReader().from_text(file.getvalue())) == grids
+
+
+def test_unknown_output_format():
+    with pytest.raises(ValueError):
+        read.OutputWriter(io.StringIO(), "json")
+
+
+def test_db_maps_solutions_onto_transforms(hard, tmp_path):
+    rng = random.Random(9)
+    path = str(tmp_path / "solutions.db")
+    with read.SolutionDB(path) as db:
+        entry = db.solve(hard[0])
+        assert entry.count == read.UNIQUE and entry.solution == dlx.first_solution(hard[0])
+        assert entry.difficulty is not None and entry.details["engine"] == "trail"
+
+    # a new connection finds the stored entry for any transform of the puzzle
+    with read.SolutionDB(path) as db:
+        for i in range(5):
+            puzzle = random_transform(rng).apply(hard[0])
+            entry = db.lookup(puzzle)
+            assert entry.count == read.UNIQUE and is_solution(entry.solution, puzzle)
+        assert db.misses == 1 and db.hits == 4
+
+
+def test_db_counts():
+    rng = random.Random(10)
+    with read.SolutionDB(":memory:") as db:
+        assert db.lookup(from_text(HARD[1])) is None
+        assert db.solve(conflicting_grid(random_solution(rng), rng)).count == read.NO_SOLUTION
+        entry = db.solve([[0] * 9 for i in range(9)])
+        assert entry.count == read.MULTIPLE and entry.difficulty is None
+
+
+def test_db_cache_size(hard):
+    with read.SolutionDB(":memory:", cache_size=2) as db:
+        for puzzle in hard[:3]:
+            db.store(puzzle, None, read.NO_SOLUTION)
+        assert len(db.cache) == 2
+        # the two most recent are in memory, the first one comes from the file
+        assert all(db.lookup(puzzle).count == read.NO_SOLUTION for puzzle in hard[2::-1])
+        assert db.hits == 2 and db.misses == 1
+
+
+def test_db_does_not_store_timeouts(hard):
+    with read.SolutionDB(":memory:") as db:
+        assert db.solve(hard[0], engine="dlx", timeout=0) is None
+        assert db.lookup(hard[0]) is None
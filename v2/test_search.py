@@ -0,0 +1,31 @@
+import classes2 as classes
+import dlx
+import search
+from conftest import LIMIT, is_solution
+
+
+def test_counts_match_dlx(grids):
+    for grid in grids:
+        run = search.Search(classes.Grid(grid), limit=LIMIT)
+        run.run(store=False)
+        assert run.count == dlx.count_solutions(grid, LIMIT)
+
+
+def test_solutions_are_distinct_and_valid(grids):
+    for grid in grids:
+        solutions = search.Search(classes.Grid(grid), limit=5).run()
+        assert len({str(solution) for solution in solutions}) == len(solutions)
+        assert all(is_solution(solution, grid) for solution in solutions)
+
+
+def test_grid_is_left_as_it_was(grids):
+    for puzzle in grids:
+        grid = classes.Grid(puzzle)
+        state = grid.state.tobytes()
+        search.Search(grid, limit=2).run()
+        assert grid.state.tobytes() == state and grid.trail is None
+
+
+def test_first_solution(hard):
+    for puzzle in hard:
+        assert search.first_solution(classes.Grid(puzzle)) == dlx.first_solution(puzzle)
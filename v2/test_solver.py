@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import classes2 as classes
+import dlx
+import solver
+from conftest import LIMIT, conflicting_grid, random_solution
+
+
+@pytest.mark.parametrize("engine", solver.ENGINES)
+def test_solutions_match_dlx(hard, engine):
+    for puzzle in hard:
+        result = solver.solve(puzzle, engine=engine, max_solutions=2)
+        assert result.status == solver.SOLVED and result.count == 1 and not result.timed_out
+        assert result.solution == dlx.first_solution(puzzle)
+
+
+@pytest.mark.parametrize("engine", solver.ENGINES)
+def test_conflicts_are_unsolvable(engine):
+    rng = random.Random(3)
+    result = solver.solve(conflicting_grid(random_solution(rng), rng), engine=engine)
+    assert result.status == solver.UNSOLVABLE and result.solution is None and result.count == 0
+
+
+@pytest.mark.parametrize("engine", ["trail", "logic"])
+def test_counts_match_dlx(grids, engine):
+    for grid in grids:
+        assert solver.count_solutions(grid, LIMIT, engine=engine) == dlx.count_solutions(grid, LIMIT)
+
+
+def test_count_leaves_the_grid_as_it_was(grids):
+    for puzzle in grids:
+        grid = classes.Grid(puzzle)
+        state = grid.state.tobytes()
+        count = solver.count_solutions(grid)
+        assert grid.state.tobytes() == state and count == dlx.count_solutions(puzzle, 2)
+
+
+def test_max_solutions():
+    empty = [[0] * 9 for i in range(9)]
+    result = solver.solve(empty, max_solutions=3)
+    assert result.count == 3 and len(result.solutions) == 3
+
+
+def test_timeout(hard):
+    result = solver.solve(hard[0], engine="dlx", timeout=0)
+    assert result.status == solver.TIMEOUT and result.timed_out
+
+
+def test_unknown_engine(hard):
+    with pytest.raises(ValueError):
+        solver.solve(hard[0], engine="guess")
+
+
+@pytest.mark.parametrize("puzzle", [
+    [[0] * 9] * 8,
+    [[0] * 8] * 9,
+    [[10] + [0] * 8] + [[0] * 9] * 8,
+    [[-1] + [0] * 8] + [[0] * 9] * 8,
+    [[1.0] + [0] * 8] + [[0] * 9] * 8,
+    [[True] + [0] * 8] + [[0] * 9] * 8,
+])
+def test_malformed_puzzles_are_rejected(puzzle):
+    for engine in ("trail", "dlx"):
+        with pytest.raises(ValueError):
+            solver.solve(puzzle, engine=engine)
+        with pytest.raises(ValueError):
+            solver.count_solutions(puzzle, engine=engine)
@@ -0,0 +1,161 @@
+import random
+
+import pytest
+
+import chains
+import classes2 as classes
+import dlx
+import generate
+
+EMPTY = [[0] * 9 for i in range(9)]
+
+
+def bits(*numbers):
+    return sum(classes.NUMBER_BITS[number] for number in numbers)
+
+
+@pytest.fixture(scope="module")
+def states(hard):
+    """(grid, solution) for every state the logic engine goes through on 20
+        puzzles once the singles are gone, to run each technique on a copy"""
+    rng = random.Random(11)
+    puzzles = hard + [generate.generate(rng=rng)[0] for i in range(15)]
+    states = []
+
+    for puzzle in puzzles:
+        solution = [number for row in dlx.first_solution(puzzle) for number in row]
+        grid = classes.Grid(puzzle)
+
+        while not grid.is_solved():
+            if grid.solve_singles():
+                continue
+            states.append((grid.copy(), solution))
+            # move on with the first technique that removes anything
+            if not any(getattr(grid, technique)() for technique in classes.Grid.LOGIC_PASSES):
+                break
+
+    return states
+
+
+def check_techniques(states, techniques):
+    """runs every technique on a copy of every state and checks that none of
+        them removes a number of the solution, and that each removes
+        something at least once"""
+    removed = dict.fromkeys(techniques, 0)
+
+    for grid, solution in states:
+        for technique in techniques:
+            copy = grid.copy()
+            removed[technique] += getattr(copy, technique)()
+            assert copy.solvable, technique
+            for index, number in enumerate(solution):
+                if copy.numbers[index]:
+                    assert copy.numbers[index] == number, technique
+                else:
+                    assert copy.masks[index] & classes.NUMBER_BITS[number], technique
+
+    assert all(removed.values()), removed
+
+
+def test_naked_subsets_keep_the_solution(states):
+    check_techniques(states, ("naked_doubles", "naked_triples", "naked_quads"))
+
+
+def test_naked_triple_of_pairs():
+    # {1, 2}, {2, 3} and {1, 3} in the first three squares of the first row
+    grid = classes.Grid(EMPTY)
+    for index, mask in ((0, bits(1, 2)), (1, bits(2, 3)), (2, bits(1, 3))):
+        grid.set_mask(index, mask)
+
+    assert grid.naked_doubles() == 0
+    # 1, 2 and 3 go from the other 6 squares of the row and of the quadrant
+    assert grid.naked_triples() == 36
+    assert all(grid.masks[index] == bits(4, 5, 6, 7, 8, 9) for index in (3, 8, 9, 20))
+    assert grid.masks[27] == classes.ALL_CANDIDATES
+
+
+def test_hidden_subsets_keep_the_solution(states):
+    check_techniques(states, ("hidden_doubles", "hidden_triples", "hidden_quads"))
+
+
+def test_hidden_pair():
+    # 1 and 2 can only go in the first two squares of the first row
+    grid = classes.Grid(EMPTY)
+    for index in range(2, 9):
+        grid.eliminate(index, bits(1, 2))
+
+    assert grid.hidden_doubles() == 14
+    assert grid.masks[0] == grid.masks[1] == bits(1, 2)
+    assert grid.hidden_doubles() == 0
+
+
+def test_intersections_keep_the_solution(states):
+    check_techniques(states, ("pointing", "box_line"))
+
+
+def test_pointing_and_box_line():
+    # 1 can only go in the first row of the first quadrant
+    grid = classes.Grid(EMPTY)
+    for index in (9, 10, 11, 18, 19, 20):
+        grid.eliminate(index, bits(1))
+    assert grid.box_line() == 0
+    assert grid.pointing() == 6
+    assert not any(grid.masks[index] & bits(1) for index in range(3, 9))
+
+    # 1 can only go in the first quadrant of the first row
+    grid = classes.Grid(EMPTY)
+    for index in range(3, 9):
+        grid.eliminate(index, bits(1))
+    assert grid.pointing() == 0
+    assert grid.box_line() == 6
+    assert not any(grid.masks[index] & bits(1) for index in (9, 10, 11, 18, 19, 20))
+
+
+def test_fish_keep_the_solution(states):
+    check_techniques(states, ("x_wing", "swordfish", "jellyfish"))
+
+
+def confine(grid, number, cols_of_rows):
+    """leaves number only in the given columns of each given row"""
+    for row, cols in cols_of_rows.items():
+        for col in range(9):
+            if col not in cols:
+                grid.eliminate(9 * row + col, bits(number))
+
+
+def test_x_wing():
+    grid = classes.Grid(EMPTY)
+    confine(grid, 1, {0: (0, 4), 4: (0, 4)})
+    assert grid.x_wing() == 14
+    assert [row for row in range(9) if grid.masks[9 * row] & bits(1)] == [0, 4]
+    assert grid.x_wing() == 0
+
+
+def test_swordfish():
+    # rows 0, 3 and 6 each have 1 in two of the columns 0, 3 and 6
+    grid = classes.Grid(EMPTY)
+    confine(grid, 1, {0: (0, 3), 3: (3, 6), 6: (0, 6)})
+    assert grid.x_wing() == 0
+    assert grid.swordfish() == 18
+    assert all([row for row in range(9) if grid.masks[9 * row + col] & bits(1)] ==
+               [row for row in (0, 3, 6) if grid.masks[9 * row + col] & bits(1)] for col in (0, 3, 6))
+
+
+def test_chains_keep_the_solution(states):
+    check_techniques(states, ("simple_coloring", "xy_chains", "forcing_chains"))
+
+
+def test_forcing_chains_assumption_budget(states):
+    unlimited = chains.Chains(time_limit=None)
+    budget = chains.Chains(time_limit=None, assumptions=chains.MAX_ASSUMPTIONS)
+    nothing = chains.Chains(time_limit=None, assumptions=0)
+    removed = 0
+
+    for grid, solution in states:
+        found = unlimited.forcing_chains(grid.copy())
+        # the budget is well above what these puzzles need
+        assert budget.forcing_chains(grid.copy()) == found
+        assert nothing.forcing_chains(grid.copy()) == 0
+        removed += found
+
+    assert removed
@@ -1,12 +1,16 @@
 import pygame
-pygame.init()
 
 
 class Button:
     """ Simple button class that is not much more than a text in a box"""
-    font = pygame.font.SysFont("Arial", 20)
+    # created when the first button is made rather than at import
+    font = None
 
     def __init__(self, text, pos, colour=(255, 255, 255)):
+        if Button.font is None:
+            pygame.font.init()
+            Button.font = pygame.font.SysFont("Arial", 20)
+
         self.image = pygame.Surface((150, 50))
         self.image.fill((120, 120, 120))
         self.text = self.font.render(text, True, colour)
@@ -19,8 +23,12 @@ class Button:
         screen.blit(self.image, self.pos)
 
     def cannot_solve(self):
+        self.show("Cannot be solved")
+
+    def show(self, text):
+        """shows text instead of the button's own text until reset() is called"""
         self.image.fill((120, 120, 120))
-        text2 = self.font.render("Cannot be solved", True, self.colour)
+        text2 = self.font.render(text, True, self.colour)
         self.image.blit(text2, ((self.image.get_width() - text2.get_width()) // 2,
                                     (self.image.get_height() - text2.get_height()) // 2))
 